@@ -3,69 +3,358 @@
 from __future__ import annotations
 
 import os
+import re
+import threading
+from contextvars import ContextVar
+from typing import Callable
 
 from anthropic import Anthropic
 from dotenv import load_dotenv
 
-from editor.prompts import AI_ONLY_SYSTEM, HUMAN_FEEDBACK_SYSTEM, PREFERENCE_EXTRACTION
+from editor.changes import build_change_log
+from editor.parser import OutputParser, ParsedOutput, parse_output, validate_final
+from editor.prompts import (
+    AI_ONLY_SYSTEM,
+    FAST_AI_ONLY_SYSTEM,
+    FAST_FEEDBACK_SYSTEM,
+    FINAL_REASK_SYSTEM,
+    HUMAN_FEEDBACK_SYSTEM,
+    MERGE_PREFERENCES,
+    PREFERENCE_COMPACTION,
+    PREFERENCE_EXTRACTION,
+    REASONING_REASK_SYSTEM,
+    RULE_CANDIDATES,
+    SPECULATIVE_REWRITE_SYSTEM,
+    SPECULATIVE_SCAN_SYSTEM,
+)
+from editor.routing import escalation_for, max_tokens_for, model_for
+from editor.scheduler import class_for, get_scheduler
+from editor.text import estimate_tokens, join_paragraphs, split_paragraphs
+from editor.trace import mark, span
 
 load_dotenv()
 
-MODEL = "claude-sonnet-4-20250514"
-DELIMITER = "===FINAL==="
+# authorpreferences.md is compacted automatically once it passes this size
+COMPACT_THRESHOLD_TOKENS = int(os.getenv("EDITOR_COMPACT_THRESHOLD_TOKENS", "2000"))
+
+_TAG_RE = re.compile(r"^[ \t]*\[P(\d+)\][ \t]*$", re.MULTILINE)
+# One entry of the scan's comma-separated answer: "3", "P3" or "[P3]"
+_SCAN_ITEM_RE = re.compile(r"^\[?P?(\d+)\]?$", re.IGNORECASE)
+
+# Per-session record of which model served each call (see start_call_log).
+_call_log: ContextVar[list[dict] | None] = ContextVar("call_log", default=None)
+
+
+_client: Anthropic | None = None
+_client_lock = threading.Lock()
 
 
 def _get_client() -> Anthropic:
-    api_key = os.getenv("ANTHROPIC_API_KEY")
-    if not api_key:
-        raise RuntimeError("ANTHROPIC_API_KEY not set. Add it to your .env file.")
-    return Anthropic(api_key=api_key)
+    """Return the shared Anthropic client, creating it on first use.
+
+    Reusing one client keeps its connection pool warm across calls; it is
+    safe to share between threads.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            api_key = os.getenv("ANTHROPIC_API_KEY")
+            if not api_key:
+                raise RuntimeError("ANTHROPIC_API_KEY not set. Add it to your .env file.")
+            _client = Anthropic(api_key=api_key)
+        return _client
+
+
+def start_call_log() -> list[dict]:
+    """Start recording calls for the current session and return the record list.
+
+    Each call made afterwards (in this thread/context) appends
+    {'task': ..., 'model': ...} to the returned list.
+    """
+    calls: list[dict] = []
+    _call_log.set(calls)
+    return calls
+
 
+def _record_call(task: str, model: str) -> None:
+    calls = _call_log.get()
+    if calls is not None:
+        calls.append({"task": task, "model": model})
 
-def _call_claude(system: str, user_content: str, max_tokens: int = 16384) -> str:
-    """Make a single Claude API call and return the text response."""
+
+def _call_claude(
+    system: str,
+    user_content: str,
+    max_tokens: int = 16384,
+    on_text: Callable[[str], None] | None = None,
+    task: str = "default",
+    model: str | None = None,
+) -> str:
+    """Make a single Claude API call and return the text response.
+
+    The model is picked from the task type unless given explicitly, and
+    max_tokens is clamped to that model's output limit. If on_text
+    is given the response is streamed and each text delta is passed to it as
+    it arrives; the full text is still returned at the end. The call waits
+    for a slot from the shared scheduler (see scheduler.py) first.
+    """
+    model = model or model_for(task)
+    max_tokens = max_tokens_for(model, max_tokens)
+    _record_call(task, model)
     client = _get_client()
-    response = client.messages.create(
-        model=MODEL,
-        max_tokens=max_tokens,
-        system=system,
-        messages=[{"role": "user", "content": user_content}],
+    cls = class_for(task)
+    scheduler = get_scheduler()
+    with span("queue_wait", priority=cls):
+        ticket = scheduler.acquire(cls, estimate_tokens(system) + estimate_tokens(user_content) + max_tokens)
+    try:
+        with span("api_call", task=task, model=model, priority=cls, streamed=on_text is not None,
+                  prompt_chars=len(system) + len(user_content)) as args:
+            if on_text is None:
+                response = client.messages.create(
+                    model=model,
+                    max_tokens=max_tokens,
+                    system=system,
+                    messages=[{"role": "user", "content": user_content}],
+                )
+                return response.content[0].text
+
+            with client.messages.stream(
+                model=model,
+                max_tokens=max_tokens,
+                system=system,
+                messages=[{"role": "user", "content": user_content}],
+            ) as stream:
+                for text in stream.text_stream:
+                    mark(args, "first_token_ms")
+                    on_text(text)
+                return stream.get_final_text()
+    finally:
+        scheduler.release(ticket)
+
+
+def _run_edit(
+    system: str,
+    user_content: str,
+    original: str,
+    task: str,
+    model: str | None = None,
+) -> tuple[str, str]:
+    """Stream an edit call through OutputParser and repair the result.
+
+    A missing chapter is re-asked for on its own. If the chapter still fails
+    validation, the whole edit is re-run once with a stronger model when one
+    is configured, otherwise the chapter is re-asked for.
+    """
+    model = model or model_for(task)
+    parser = OutputParser()
+    raw = _call_claude(system, user_content, on_text=parser.feed, task=task, model=model)
+    with span("parse"):
+        if not parser.fed:
+            # Non-streaming backend: the whole response arrives at once
+            parser.feed(raw)
+        parsed = parser.close()
+        parsed.problems = validate_final(parsed.final, original)
+
+    reasked = False
+    if parsed.missing_final:
+        parsed = _reask_final(parsed, original, task, model)
+        reasked = True
+    if parsed.problems:
+        stronger = escalation_for(model)
+        if stronger:
+            return _run_edit(system, user_content, original, task, model=stronger)
+        if not reasked:
+            parsed = _reask_final(parsed, original, task, model)
+    if parsed.missing_reasoning:
+        parsed.reasoning = _reask_reasoning(original, parsed.final)
+
+    return (parsed.reasoning, parsed.final)
+
+
+def _run_fast_edit(
+    system: str,
+    user_content: str,
+    original: str,
+    preferences: str,
+    task: str,
+    model: str | None = None,
+) -> tuple[str, str]:
+    """Fast mode: ask only for the chapter and compute the change log locally.
+
+    A chapter that fails validation is re-run once with a stronger model when
+    one is configured.
+    """
+    model = model or model_for(task)
+    raw = _call_claude(system, user_content, task=task, model=model)
+    with span("parse"):
+        parsed = parse_output(raw)
+        # The model may still add a reasoning preamble; keep only the chapter
+        final = parsed.final if parsed.delimiter_found else raw.strip()
+        problems = validate_final(final, original)
+
+    if problems:
+        stronger = escalation_for(model)
+        if stronger:
+            return _run_fast_edit(system, user_content, original, preferences, task, model=stronger)
+
+    with span("change_log"):
+        return (build_change_log(original, final, preferences), final)
+
+
+def _reask_final(parsed: ParsedOutput, original: str, task: str, model: str) -> ParsedOutput:
+    """Ask again for only the clean chapter, reusing the change log we already have.
+
+    If the re-ask is no better, the first attempt's chapter is kept.
+    """
+    user_content = (
+        f"ORIGINAL:\n{original}\n\n"
+        f"CHANGES:\n{parsed.reasoning or '(No change log was produced.)'}"
     )
-    return response.content[0].text
+    final = _call_claude(FINAL_REASK_SYSTEM, user_content, task=task, model=model).strip()
+    problems = validate_final(final, original)
+    if not problems or len(problems) < len(parsed.problems):
+        parsed.final, parsed.problems = final, problems
+    return parsed
+
+
+def _reask_reasoning(original: str, final: str) -> str:
+    """Ask for only the change log when the response held just the chapter."""
+    if not final:
+        return "(No reasoning section found in response.)"
+    user_content = f"ORIGINAL:\n{original}\n\nFINAL:\n{final}"
+    reasoning = _call_claude(REASONING_REASK_SYSTEM, user_content, max_tokens=4096, task="changelog").strip()
+    return reasoning or "(No reasoning section found in response.)"
+
+
+def _book_context_section(book_context: str) -> str:
+    return f"\n\nBOOK CONTEXT:\n{book_context}" if book_context else ""
 
 
 def edit_with_feedback(
     original: str,
     feedback: str,
     preferences: str,
+    book_context: str = "",
+    fast: bool = False,
 ) -> tuple[str, str]:
     """Human Feedback Mode: edit a chapter using human feedback + preferences.
 
+    book_context is an optional cross-chapter summary (see index.book_summary).
+    With fast=True Claude returns only the chapter and the reasoning is a
+    locally computed change log.
+
     Returns (reasoning, final_chapter).
     """
-    user_content = (
-        f"ORIGINAL:\n{original}\n\n"
-        f"FEEDBACK:\n{feedback}\n\n"
-        f"PREFERENCES:\n{preferences if preferences else '(No preferences established yet — this is the first session.)'}"
-    )
-    raw = _call_claude(HUMAN_FEEDBACK_SYSTEM, user_content)
-    return _split_output(raw)
+    with span("build_prompt"):
+        user_content = (
+            f"ORIGINAL:\n{original}\n\n"
+            f"FEEDBACK:\n{feedback}\n\n"
+            f"PREFERENCES:\n{preferences if preferences else '(No preferences established yet — this is the first session.)'}"
+            f"{_book_context_section(book_context)}"
+        )
+    if fast:
+        return _run_fast_edit(FAST_FEEDBACK_SYSTEM, user_content, original, preferences, task="edit_feedback")
+    return _run_edit(HUMAN_FEEDBACK_SYSTEM, user_content, original, task="edit_feedback")
 
 
 def edit_ai_only(
     original: str,
     preferences: str,
+    speculative: bool = False,
+    book_context: str = "",
+    fast: bool = False,
 ) -> tuple[str, str]:
     """AI-Only Mode: edit a chapter using only established preferences.
 
+    With speculative=True a fast model first flags the paragraphs that need
+    changes and only those are rewritten (see _edit_speculative); the two
+    modes don't combine, so speculative=True ignores fast.
+    book_context is an optional cross-chapter summary (see index.book_summary).
+    With fast=True Claude returns only the chapter and the reasoning is a
+    locally computed change log.
+
     Returns (reasoning, final_chapter).
     """
-    user_content = (
-        f"ORIGINAL:\n{original}\n\n"
-        f"PREFERENCES:\n{preferences if preferences else '(No preferences established yet. Apply general fiction-editing best practices conservatively.)'}"
+    if speculative and preferences:
+        return _edit_speculative(original, preferences, book_context)
+
+    with span("build_prompt"):
+        user_content = (
+            f"ORIGINAL:\n{original}\n\n"
+            f"PREFERENCES:\n{preferences if preferences else '(No preferences established yet. Apply general fiction-editing best practices conservatively.)'}"
+            f"{_book_context_section(book_context)}"
+        )
+    if fast:
+        return _run_fast_edit(FAST_AI_ONLY_SYSTEM, user_content, original, preferences, task="edit_ai_only")
+    return _run_edit(AI_ONLY_SYSTEM, user_content, original, task="edit_ai_only")
+
+
+def _edit_speculative(original: str, preferences: str, book_context: str = "") -> tuple[str, str]:
+    """Two-tier AI-only edit: fast scan for candidate paragraphs, then rewrite only those.
+
+    Unflagged paragraphs are passed through verbatim; a flagged paragraph the
+    rewrite leaves out also keeps its original text. A scan reply that isn't
+    a plain list of paragraph numbers falls back to a full AI-only edit.
+    """
+    paragraphs = split_paragraphs(original)
+    numbered = "\n\n".join(f"[P{i}]\n{p}" for i, p in enumerate(paragraphs, 1))
+
+    scan = _call_claude(
+        SPECULATIVE_SCAN_SYSTEM,
+        f"PREFERENCES:\n{preferences}{_book_context_section(book_context)}\n\nCHAPTER:\n{numbered}",
+        max_tokens=1024,
+        task="scan",
+    )
+    numbers = _parse_scan(scan)
+    if numbers is None:
+        return edit_ai_only(original, preferences, book_context=book_context)
+    flagged = sorted({n for n in numbers if 1 <= n <= len(paragraphs)})
+    summary = f"Fast scan flagged {len(flagged)} of {len(paragraphs)} paragraph(s)"
+
+    if not flagged:
+        return (f"{summary}; no changes needed.", join_paragraphs(paragraphs))
+
+    selected = "\n\n".join(f"[P{i}]\n{paragraphs[i - 1]}" for i in flagged)
+    raw = _call_claude(
+        SPECULATIVE_REWRITE_SYSTEM,
+        f"PREFERENCES:\n{preferences}\n\nPARAGRAPHS:\n{selected}",
+        task="rewrite",
     )
-    raw = _call_claude(AI_ONLY_SYSTEM, user_content)
-    return _split_output(raw)
+    parsed = parse_output(raw)
+    body = parsed.final if parsed.delimiter_found else raw
+    reasoning = parsed.reasoning if parsed.delimiter_found else "(No reasoning section found in response.)"
+
+    rewritten = _parse_tagged_paragraphs(body)
+    for i in flagged:
+        if rewritten.get(i):
+            paragraphs[i - 1] = rewritten[i]
+
+    flagged_list = ", ".join(str(i) for i in flagged)
+    return (f"{summary}: {flagged_list}.\n\n{reasoning}", join_paragraphs(paragraphs))
+
+
+def _parse_scan(scan: str) -> list[int] | None:
+    """Parse the scan's "3, P7, 12" / "NONE" answer. Returns None if it is anything else."""
+    text = scan.strip().rstrip(".")
+    if not text or text.upper() == "NONE":
+        return []
+    numbers = []
+    for item in re.split(r"[,\s]+", text):
+        match = _SCAN_ITEM_RE.match(item)
+        if not match:
+            return None
+        numbers.append(int(match.group(1)))
+    return numbers
+
+
+def _parse_tagged_paragraphs(body: str) -> dict[int, str]:
+    """Parse '[P3]' tagged blocks into {3: text}."""
+    blocks: dict[int, str] = {}
+    parts = _TAG_RE.split(body)
+    # parts = [preamble, num, text, num, text, ...]
+    for num, text in zip(parts[1::2], parts[2::2]):
+        blocks[int(num)] = text.strip()
+    return blocks
 
 
 def update_preferences(
@@ -78,26 +367,64 @@ def update_preferences(
 
     Returns the updated authorpreferences.md content (plain English).
     """
-    prompt = PREFERENCE_EXTRACTION.format(
-        original=original,
-        feedback=feedback,
-        final=final,
-        current_preferences=current_preferences if current_preferences else "(No existing preferences — this is the first session.)",
-    )
+    with span("update_preferences"):
+        prompt = PREFERENCE_EXTRACTION.format(
+            original=original,
+            feedback=feedback,
+            final=final,
+            current_preferences=current_preferences if current_preferences else "(No existing preferences — this is the first session.)",
+        )
+        return _call_claude(
+            "You are a style-preference analyst for a fiction author.",
+            prompt,
+            max_tokens=4096,
+            task="preferences",
+        )
+
+
+def needs_compaction(preferences: str) -> bool:
+    """True if the preferences have grown past the auto-compaction threshold."""
+    return estimate_tokens(preferences) > COMPACT_THRESHOLD_TOKENS
+
+
+def compact_preferences(preferences: str) -> str:
+    """Merge duplicate rules, trim examples and drop stale notes.
+
+    Returns the compacted document, or the original if the result is empty
+    or no shorter.
+    """
+    compacted = _call_claude(
+        "You are a style-preference analyst for a fiction author.",
+        PREFERENCE_COMPACTION.format(preferences=preferences),
+        max_tokens=4096,
+        task="compaction",
+    ).strip()
+    if not compacted or len(compacted) >= len(preferences):
+        return preferences
+    return compacted
+
+
+def extract_rule_candidates(original: str, feedback: str, final: str) -> str:
+    """Extract the style rules shown by a single archived feedback session.
+
+    Returns a plain-English bulleted list (the "map" step of a rebuild).
+    """
+    prompt = RULE_CANDIDATES.format(original=original, feedback=feedback, final=final)
     return _call_claude(
         "You are a style-preference analyst for a fiction author.",
         prompt,
         max_tokens=4096,
-    )
+        task="preferences",
+    ).strip()
 
 
-def _split_output(raw: str) -> tuple[str, str]:
-    """Split Claude's response on ===FINAL=== into (reasoning, chapter)."""
-    if DELIMITER not in raw:
-        # Fallback: treat entire response as the final chapter, no reasoning
-        return ("(No reasoning section found in response.)", raw.strip())
-
-    parts = raw.split(DELIMITER, 1)
-    reasoning = parts[0].strip()
-    final = parts[1].strip()
-    return (reasoning, final)
+def merge_preferences(documents: list[str]) -> str:
+    """Merge several preference lists into one consolidated document (the "reduce" step)."""
+    joined = "\n\n".join(f"--- LIST {n} ---\n{doc}" for n, doc in enumerate(documents, 1))
+    prompt = MERGE_PREFERENCES.format(count=len(documents), documents=joined)
+    return _call_claude(
+        "You are a style-preference analyst for a fiction author.",
+        prompt,
+        max_tokens=4096,
+        task="preferences",
+    ).strip()
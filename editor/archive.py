@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import hashlib
+import json
 import shutil
 from datetime import datetime
 from pathlib import Path
@@ -14,48 +16,147 @@ from editor.profile import (
     ORIGINAL_PATH,
     read_file,
     wipe_file,
+    write_file,
 )
+from editor.trace import span
 
+SESSION_META_NAME = "session.json"
+PREFERENCES_SNAPSHOT_DIR = ".preferences"
 
-def archive_human_feedback() -> Path:
+
+def _new_session_dir(mode: str) -> Path:
+    """Create history/{YYYY-MM-DD_HHMMSS}_{mode}/, adding -2, -3... on collision.
+
+    Safe when several sessions are archived in the same second.
+    """
+    stamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
+    HISTORY_DIR.mkdir(parents=True, exist_ok=True)
+    n = 1
+    while True:
+        suffix = f"-{n}" if n > 1 else ""
+        folder = HISTORY_DIR / f"{stamp}{suffix}_{mode}"
+        try:
+            folder.mkdir()
+            return folder
+        except FileExistsError:
+            n += 1
+
+
+def archive_human_feedback(meta: dict | None = None, preferences: str | None = None) -> Path:
     """Archive original.md, edited.md, final.md, aiedited.md for a human feedback session.
 
+    If meta is given it is written to session.json in the archive folder. If
+    preferences is given, its snapshot version is recorded there too.
     Returns the archive directory path.
     """
-    stamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
-    folder = HISTORY_DIR / f"{stamp}_human"
-    folder.mkdir(parents=True, exist_ok=True)
+    with span("archive", mode="human"):
+        folder = _new_session_dir("human")
+        for src in [ORIGINAL_PATH, EDITED_PATH, FINAL_PATH, AIEDITED_PATH]:
+            if src.exists() and read_file(src):
+                shutil.copy2(src, folder / src.name)
+        _write_meta(folder, meta, preferences)
+
+    wipe_working_files()
+    return folder
+
 
-    for src in [ORIGINAL_PATH, EDITED_PATH, FINAL_PATH, AIEDITED_PATH]:
-        if src.exists() and read_file(src):
-            shutil.copy2(src, folder / src.name)
+def archive_ai_only(meta: dict | None = None, preferences: str | None = None) -> Path:
+    """Archive original.md and final.md for an AI-only session.
+
+    If meta is given it is written to session.json in the archive folder. If
+    preferences is given, its snapshot version is recorded there too.
+    Returns the archive directory path.
+    """
+    with span("archive", mode="ai"):
+        folder = _new_session_dir("ai")
+        for src in [ORIGINAL_PATH, FINAL_PATH]:
+            if src.exists() and read_file(src):
+                shutil.copy2(src, folder / src.name)
+        _write_meta(folder, meta, preferences)
 
     # Wipe working files (final.md stays for reference)
     wipe_file(ORIGINAL_PATH)
+    wipe_file(AIEDITED_PATH)
+
+    return folder
+
+
+def wipe_working_files() -> None:
+    """Wipe original.md, edited.md and aiedited.md (final.md stays for reference)."""
+    wipe_file(ORIGINAL_PATH)
     wipe_file(EDITED_PATH)
     wipe_file(AIEDITED_PATH)
 
+
+def archive_texts(
+    mode: str,
+    texts: dict[str, str],
+    meta: dict | None = None,
+    preferences: str | None = None,
+) -> Path:
+    """Archive in-memory session texts (e.g. {'original.md': ...}) without touching working files.
+
+    Used by the job server, where concurrent sessions can't share the
+    repo-root working files. Returns the archive directory path.
+    """
+    with span("archive", mode=mode):
+        folder = _new_session_dir(mode)
+        for name, content in texts.items():
+            if content:
+                write_file(folder / name, content)
+        _write_meta(folder, meta, preferences)
     return folder
 
 
-def archive_ai_only() -> Path:
-    """Archive original.md and final.md for an AI-only session.
+def _write_meta(folder: Path, meta: dict | None, preferences: str | None) -> None:
+    meta = dict(meta or {})
+    if preferences is not None:
+        meta["preferences_version"] = snapshot_preferences(preferences)
+    if meta:
+        write_session_meta(folder, meta)
 
-    Returns the archive directory path.
+
+def write_session_meta(folder: Path, meta: dict) -> None:
+    """Merge meta into the session's session.json."""
+    merged = {**read_session_meta(folder), **meta}
+    write_file(folder / SESSION_META_NAME, json.dumps(merged, indent=2))
+
+
+def read_session_meta(folder: Path) -> dict:
+    """Read a session's session.json. Returns {} if missing or unreadable."""
+    text = read_file(folder / SESSION_META_NAME)
+    if not text:
+        return {}
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return {}
+
+
+def snapshot_preferences(preferences: str) -> str:
+    """Store a copy of the preferences under history/.preferences/ and return its version.
+
+    The version is a short content hash, recorded in session.json so later
+    runs know which rules a session's final.md was produced under.
     """
-    stamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
-    folder = HISTORY_DIR / f"{stamp}_ai"
-    folder.mkdir(parents=True, exist_ok=True)
+    version = hashlib.sha256(preferences.encode("utf-8")).hexdigest()[:12]
+    path = HISTORY_DIR / PREFERENCES_SNAPSHOT_DIR / f"{version}.md"
+    if not path.exists():
+        write_file(path, preferences)
+    return version
 
-    for src in [ORIGINAL_PATH, FINAL_PATH]:
-        if src.exists() and read_file(src):
-            shutil.copy2(src, folder / src.name)
 
-    # Wipe working files (final.md stays for reference)
-    wipe_file(ORIGINAL_PATH)
-    wipe_file(AIEDITED_PATH)
+def load_preferences_snapshot(version: str) -> str:
+    """Return the preferences text for a version. '' if unknown."""
+    return read_file(HISTORY_DIR / PREFERENCES_SNAPSHOT_DIR / f"{version}.md")
 
-    return folder
+
+def find_session(name: str) -> Path | None:
+    """Folder of the archived session called name, or None if there is none."""
+    if not name or name.startswith(".") or Path(name).name != name:
+        return None
+    folder = HISTORY_DIR / name
+    return folder if folder.is_dir() else None
 
 
 def list_history() -> list[dict]:
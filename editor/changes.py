@@ -0,0 +1,96 @@
+"""Compute the aiedited.md change log locally from original → final.
+
+Used by fast mode, where Claude returns only the clean chapter. Paragraphs
+are aligned with difflib first; changed paragraphs are then diffed sentence
+by sentence so each entry shows just the sentences that moved. Entries are
+annotated with the preference/lint rules (see rules.py) whose matches the
+change removed.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+
+from editor.rules import Rule, count_matches, extract_rules
+from editor.text import split_paragraphs, split_sentences
+
+
+@dataclass
+class Change:
+    """One changed run of sentences or paragraphs."""
+
+    kind: str  # "changed", "added" or "removed"
+    paragraph: int  # 1-based paragraph number in the original (final, if added)
+    before: str
+    after: str
+    rules: list[Rule] = field(default_factory=list)
+
+
+def diff_changes(original: str, final: str) -> list[Change]:
+    """Diff two chapter texts into paragraph/sentence-level changes."""
+    a = split_paragraphs(original)
+    b = split_paragraphs(final)
+    changes: list[Change] = []
+
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag == "equal":
+            continue
+        if tag == "delete":
+            changes.extend(Change("removed", i + 1, a[i], "") for i in range(i1, i2))
+        elif tag == "insert":
+            changes.extend(Change("added", j + 1, "", b[j]) for j in range(j1, j2))
+        else:
+            changes.extend(_diff_sentences(a, i1, i2, b[j1:j2]))
+
+    return changes
+
+
+def _diff_sentences(a: list[str], i1: int, i2: int, new_paragraphs: list[str]) -> list[Change]:
+    """Sentence-level diff of original paragraphs a[i1:i2] against their replacements."""
+    old: list[tuple[int, str]] = [
+        (i + 1, s) for i in range(i1, i2) for s in split_sentences(a[i])
+    ]
+    new = [s for p in new_paragraphs for s in split_sentences(p)]
+    old_text = [s for _, s in old]
+
+    changes = []
+    for tag, k1, k2, l1, l2 in SequenceMatcher(None, old_text, new, autojunk=False).get_opcodes():
+        if tag == "equal":
+            continue
+        paragraph = old[k1][0] if k1 < len(old) else old[-1][0] if old else i1 + 1
+        kind = {"replace": "changed", "delete": "removed", "insert": "added"}[tag]
+        changes.append(Change(kind, paragraph, " ".join(old_text[k1:k2]), " ".join(new[l1:l2])))
+    return changes
+
+
+def annotate(changes: list[Change], rules: list[Rule]) -> list[Change]:
+    """Attach the rules each change reduced the match count of."""
+    for change in changes:
+        change.rules = [
+            r for r in rules
+            if count_matches(change.before, r) > count_matches(change.after, r)
+        ]
+    return changes
+
+
+def build_change_log(original: str, final: str, preferences: str = "") -> str:
+    """Render the aiedited.md change log for an original → final pair."""
+    changes = annotate(diff_changes(original, final), extract_rules(preferences))
+
+    lines = ["# Change log (computed locally from original → final)", ""]
+    if not changes:
+        lines.append("No changes — the final chapter matches the original.")
+        return "\n".join(lines)
+
+    lines.append(f"{len(changes)} change(s).")
+    for n, change in enumerate(changes, 1):
+        reason = ", ".join(f"preference: {r.label}" for r in change.rules)
+        lines.append("")
+        lines.append(f"{n}. Paragraph {change.paragraph} — {change.kind}" + (f" [{reason}]" if reason else ""))
+        if change.before:
+            lines.append(f"   Before: {change.before}")
+        if change.after:
+            lines.append(f"   After: {change.after}")
+
+    return "\n".join(lines)
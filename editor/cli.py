@@ -1,22 +1,60 @@
-"""Click CLI — edit, preferences, history, reset commands."""
+"""Click CLI — edit, book, reapply, serve, metrics, preferences, history (search), index, reset commands."""
 
 from __future__ import annotations
 
 import sys
+from pathlib import Path
+from typing import Callable
 
 import click
-
-from editor.analyzer import edit_ai_only, edit_with_feedback, update_preferences
-from editor.archive import archive_ai_only, archive_human_feedback, list_history
+from anthropic import AnthropicError
+
+from editor.analyzer import (
+    compact_preferences,
+    edit_ai_only,
+    edit_with_feedback,
+    needs_compaction,
+    start_call_log,
+    update_preferences,
+)
+from editor.archive import (
+    archive_ai_only,
+    archive_human_feedback,
+    list_history,
+    snapshot_preferences,
+    wipe_working_files,
+)
+from editor.client import DEFAULT_SERVER, request_json, run_job, run_jobs
+from editor.index import book_summary, rebuild_index, update_index
+from editor.manuscript import UNITS, edit_manuscript
 from editor.profile import (
+    OUTPUT_DIR,
+    backup_preferences,
     load_feedback,
     load_original,
     load_preferences,
     reset_preferences,
+    rollback_preferences,
     save_final,
     save_preferences,
     save_reasoning,
 )
+from editor.rebuild import rebuild_preferences
+from editor.reapply import Candidate, mark_checked, plan_reapply, reapply_affected
+from editor.search import SEARCHED_FILES, rebuild_search_index, search, update_search_index
+from editor.server import make_server
+from editor.text import estimate_tokens
+from editor.trace import env_mode, span, start_trace, stop_trace
+
+
+# Shared by the commands that can hand their Claude work to a job server
+server_option = click.option(
+    "--server",
+    envvar="EDITOR_SERVER",
+    show_envvar=True,
+    metavar="URL",
+    help="Run on this job server (e.g. http://127.0.0.1:8765) so the work shares its scheduler.",
+)
 
 
 @click.group()
@@ -25,13 +63,55 @@ def cli():
 
 
 @cli.command()
-def edit():
+@click.option(
+    "--speculative",
+    is_flag=True,
+    help="AI-only mode: let a fast model flag paragraphs first and rewrite only those.",
+)
+@click.option(
+    "--fast",
+    is_flag=True,
+    help="Ask Claude for the clean chapter only; build aiedited.md locally from a diff.",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Record timing spans and save them as trace.json in the archive folder (or set EDITOR_TRACE=1).",
+)
+@click.option(
+    "--cprofile",
+    is_flag=True,
+    help="Like --profile, and also save a cProfile dump as profile.pstats (or set EDITOR_TRACE=cprofile).",
+)
+@server_option
+def edit(speculative: bool, fast: bool, profile: bool, cprofile: bool, server: str | None):
     """Run the full editing workflow.
 
     Reads original.md and edited.md, detects mode (human feedback vs AI-only),
     calls Claude, writes aiedited.md and final.md, updates preferences if
     applicable, and archives everything.
     """
+    if speculative and fast:
+        raise click.UsageError("--speculative and --fast can't be combined; pick one.")
+    mode = "cprofile" if cprofile else "trace" if profile else env_mode()
+    tracer = start_trace(cprofile=mode == "cprofile") if mode else None
+    try:
+        with span("edit"):
+            archive_dir = _edit_session(speculative, fast, server)
+    finally:
+        if tracer:
+            stop_trace()
+
+    if tracer:
+        for path in tracer.save(archive_dir):
+            click.echo(f"Wrote {path.name} to the archive folder")
+    click.echo("Done.")
+
+
+def _edit_session(speculative: bool, fast: bool, server: str | None = None) -> Path:
+    """Body of `edit`: run one session and return its archive folder."""
+    calls = start_call_log()
+
     # 1. Read original.md
     original = load_original()
     if not original:
@@ -42,6 +122,8 @@ def edit():
 
     # 2. Read edited.md to detect mode
     feedback = load_feedback()
+    if server:
+        return _edit_on_server(server, original, feedback, speculative, fast)
     preferences = load_preferences()
 
     if preferences:
@@ -49,6 +131,11 @@ def edit():
     else:
         click.echo("No authorpreferences.md yet (first run or reset)")
 
+    with span("book_context"):
+        book_context = book_summary(original, preferences)
+    if book_context:
+        click.echo(f"Built book context from history index ({len(book_context)} chars)")
+
     # 3. Dispatch based on mode
     if feedback:
         click.echo("\n--- HUMAN FEEDBACK MODE ---")
@@ -56,7 +143,9 @@ def edit():
         click.echo("Sending to Claude for editing...")
 
         try:
-            reasoning, final = edit_with_feedback(original, feedback, preferences)
+            reasoning, final = edit_with_feedback(
+                original, feedback, preferences, book_context=book_context, fast=fast
+            )
         except RuntimeError as exc:
             click.echo(f"Error: {exc}", err=True)
             sys.exit(1)
@@ -70,16 +159,28 @@ def edit():
         click.echo("Extracting style preferences from feedback...")
         try:
             new_prefs = update_preferences(original, feedback, final, preferences)
-        except RuntimeError as exc:
+        except (RuntimeError, AnthropicError) as exc:
             click.echo(f"Warning: preference update failed: {exc}", err=True)
             new_prefs = None
 
         if new_prefs:
             save_preferences(new_prefs)
             click.echo(f"Updated authorpreferences.md ({len(new_prefs)} chars)")
+            if needs_compaction(new_prefs):
+                click.echo("authorpreferences.md has grown large — compacting...")
+                _compact(new_prefs)
 
-        # Archive and wipe
-        archive_dir = archive_human_feedback()
+        _echo_models(calls)
+
+        # Archive and wipe. final.md already follows the rules this session just
+        # taught, so reapply shouldn't count them as new for it.
+        meta = {"calls": calls}
+        if new_prefs:
+            meta["rules_checked_version"] = snapshot_preferences(load_preferences())
+        archive_dir = archive_human_feedback(meta=meta, preferences=preferences)
+        with span("update_index"):
+            update_index(archive_dir)
+            update_search_index(archive_dir)
         click.echo(f"\nArchived to {archive_dir}")
 
     else:
@@ -88,7 +189,9 @@ def edit():
         click.echo("Sending to Claude for editing...")
 
         try:
-            reasoning, final = edit_ai_only(original, preferences)
+            reasoning, final = edit_ai_only(
+                original, preferences, speculative=speculative, book_context=book_context, fast=fast
+            )
         except RuntimeError as exc:
             click.echo(f"Error: {exc}", err=True)
             sys.exit(1)
@@ -101,16 +204,103 @@ def edit():
         # No preference update in AI-only mode
         click.echo("(Skipping preference update — no human feedback)")
 
+        _echo_models(calls)
+
         # Archive and wipe
-        archive_dir = archive_ai_only()
+        archive_dir = archive_ai_only(meta={"calls": calls}, preferences=preferences)
+        with span("update_index"):
+            update_index(archive_dir)
+            update_search_index(archive_dir)
         click.echo(f"\nArchived to {archive_dir}")
 
-    click.echo("Done.")
+    return archive_dir
+
+
+def _edit_on_server(server: str, original: str, feedback: str, speculative: bool, fast: bool) -> Path:
+    """Run the session as an interactive job on the server, which also archives it."""
+    mode = "HUMAN FEEDBACK" if feedback else "AI-ONLY"
+    click.echo(f"\n--- {mode} MODE (job server) ---")
+    click.echo(f"Sending to {server}...")
+    try:
+        job = run_job(server, {"original": original, "feedback": feedback,
+                               "fast": fast, "speculative": speculative})
+    except RuntimeError as exc:
+        click.echo(f"Error: {exc}", err=True)
+        sys.exit(1)
 
+    result = job["result"]
+    save_final(result["final"])
+    click.echo(f"Wrote final.md ({len(result['final'])} chars)")
+    if job["warning"]:
+        click.echo(f"Warning: {job['warning']}", err=True)
+    _echo_models(result["calls"])
 
-@cli.command("preferences")
-def show_preferences():
-    """Print the current authorpreferences.md to the terminal."""
+    wipe_working_files()
+    click.echo(f"\nArchived to {result['archive']}")
+    return Path(result["archive"])
+
+
+@cli.command()
+@click.argument("manuscript", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option("--unit", type=click.Choice(UNITS), default="chapter", show_default=True,
+              help="Edit the manuscript one chapter or one scene at a time.")
+@click.option("--speculative", is_flag=True, help="Use the two-tier fast-scan edit for each unit.")
+@click.option("--fast", is_flag=True, help="Chapter-only responses; change logs computed locally.")
+@click.option("--start", type=int, default=1, show_default=True,
+              help="Resume from this unit number, appending to existing output.")
+@click.option("--out", "out_dir", type=click.Path(file_okay=False, path_type=Path), default=None,
+              help="Output directory (default: output/).")
+def book(manuscript: Path, unit: str, speculative: bool, fast: bool, start: int, out_dir: Path | None):
+    """Edit a whole-book MANUSCRIPT in AI-only mode, one unit at a time.
+
+    The manuscript is read lazily and each edited unit is written out as soon
+    as it is done, so whole-novel files need no splitting by hand. Writes
+    <name>.final.md and <name>.aiedited.md to the output directory.
+    """
+    if speculative and fast:
+        raise click.UsageError("--speculative and --fast can't be combined; pick one.")
+    out_dir = out_dir or OUTPUT_DIR
+    final_path = out_dir / f"{manuscript.stem}.final.md"
+    reasoning_path = out_dir / f"{manuscript.stem}.aiedited.md"
+
+    preferences = load_preferences()
+    if not preferences:
+        click.echo("No authorpreferences.md yet — edits will be conservative best practice.")
+
+    def progress(u):
+        if u.front_matter:
+            click.echo(f"Keeping front matter as is: {u.title} ({len(u.text)} chars)")
+        else:
+            click.echo(f"Editing {unit} {u.index}: {u.title} ({len(u.text)} chars)")
+
+    try:
+        edited = edit_manuscript(
+            manuscript, final_path, reasoning_path, preferences,
+            unit=unit, speculative=speculative, fast=fast, start=start, on_unit=progress,
+        )
+    except RuntimeError as exc:
+        click.echo(f"Error: {exc}", err=True)
+        sys.exit(1)
+
+    click.echo(f"\nEdited {edited} {unit}(s)")
+    click.echo(f"Wrote {final_path}")
+    click.echo(f"Wrote {reasoning_path}")
+
+
+def _echo_models(calls: list[dict]) -> None:
+    """Print which model served each task in this session."""
+    if calls:
+        click.echo("Models used:")
+    for call in calls:
+        click.echo(f"  {call['task']}: {call['model']}")
+
+
+@cli.group("preferences", invoke_without_command=True)
+@click.pass_context
+def preferences_group(ctx: click.Context):
+    """Print the current authorpreferences.md (or manage it with a subcommand)."""
+    if ctx.invoked_subcommand is not None:
+        return
     prefs = load_preferences()
     if not prefs:
         click.echo("No preferences yet. Run an edit with human feedback first.")
@@ -118,9 +308,91 @@ def show_preferences():
     click.echo(prefs)
 
 
-@cli.command("history")
-def show_history():
-    """List all archived edit sessions."""
+@preferences_group.command("rebuild")
+@click.option("--workers", default=4, show_default=True, type=int, help="Parallel API calls.")
+@click.option("--fan-in", default=4, show_default=True, type=int, help="Lists merged per reduce call.")
+@click.option("--fresh", is_flag=True, help="Ignore cached extractions and merges.")
+@click.option("--yes", is_flag=True, help="Overwrite existing preferences without asking.")
+@server_option
+def rebuild_preferences_cmd(workers: int, fan_in: int, fresh: bool, yes: bool, server: str | None):
+    """Rebuild authorpreferences.md from all archived human-feedback sessions.
+
+    Extracts rule candidates from each session in parallel, then merges them
+    hierarchically. Results are cached, so an interrupted rebuild resumes.
+    With --server it runs there as a background job, behind authors' edits.
+    """
+    if load_preferences() and not yes:
+        click.confirm("Replace the existing authorpreferences.md?", abort=True)
+
+    def progress(stage, done, total):
+        click.echo(f"  {stage}: {done}/{total}")
+
+    try:
+        if server:
+            click.echo(f"Rebuilding on {server}...")
+            job = run_job(server, {"task": "rebuild", "workers": workers, "fan_in": fan_in, "fresh": fresh})
+            new_prefs = job["result"]["preferences"]
+        else:
+            new_prefs = rebuild_preferences(workers=workers, fan_in=fan_in, fresh=fresh, on_progress=progress)
+    except RuntimeError as exc:
+        click.echo(f"Error: {exc}", err=True)
+        sys.exit(1)
+
+    if not new_prefs:
+        click.echo("No archived human-feedback sessions to learn from.")
+        return
+    if backup_preferences():
+        click.echo("Previous version saved to authorpreferences.prev.md")
+    save_preferences(new_prefs)
+    click.echo(f"Rebuilt authorpreferences.md ({len(new_prefs)} chars)")
+
+
+@preferences_group.command("compact")
+def compact_preferences_cmd():
+    """Merge duplicate rules, trim examples and drop stale notes.
+
+    The previous version is kept in authorpreferences.prev.md for rollback.
+    """
+    prefs = load_preferences()
+    if not prefs:
+        click.echo("No preferences yet — nothing to compact.")
+        return
+    _compact(prefs)
+
+
+@preferences_group.command("rollback")
+def rollback_preferences_cmd():
+    """Swap authorpreferences.md with authorpreferences.prev.md."""
+    if rollback_preferences():
+        click.echo("Restored the previous authorpreferences.md (the replaced version is now the backup).")
+    else:
+        click.echo("No authorpreferences.prev.md found — nothing to roll back.")
+
+
+def _compact(prefs: str) -> None:
+    """Compact preferences, back up the old version and report token counts."""
+    try:
+        compacted = compact_preferences(prefs)
+    except (RuntimeError, AnthropicError) as exc:  # best effort: never lose the edit
+        click.echo(f"Warning: compaction failed: {exc}", err=True)
+        return
+
+    before, after = estimate_tokens(prefs), estimate_tokens(compacted)
+    if compacted == prefs:
+        click.echo(f"Compaction didn't shrink authorpreferences.md (~{before} tokens); kept as is.")
+        return
+    backup_preferences()
+    save_preferences(compacted)
+    click.echo(f"Compacted authorpreferences.md: ~{before} -> ~{after} tokens "
+               f"({len(prefs)} -> {len(compacted)} chars). Previous version in authorpreferences.prev.md")
+
+
+@cli.group("history", invoke_without_command=True)
+@click.pass_context
+def show_history(ctx: click.Context):
+    """List all archived edit sessions (or search them with a subcommand)."""
+    if ctx.invoked_subcommand is not None:
+        return
     sessions = list_history()
     if not sessions:
         click.echo("No archived sessions yet.")
@@ -135,6 +407,175 @@ def show_history():
         click.echo()
 
 
+@show_history.command("search")
+@click.argument("query", nargs=-1, required=True)
+@click.option("--file", "files", multiple=True, type=click.Choice(SEARCHED_FILES),
+              help="Only search this file (repeatable).")
+@click.option("--limit", default=20, show_default=True, type=int, help="Maximum hits to show.")
+@click.option("--raw", is_flag=True, help="Pass QUERY through as an FTS5 expression (\"phrases\", OR, NEAR, prefix*).")
+def search_history(query: tuple[str, ...], files: tuple[str, ...], limit: int, raw: bool):
+    """Find lines in archived sessions containing every word of QUERY, best matches first."""
+    try:
+        hits = search(" ".join(query), limit=limit, files=files, raw=raw)
+    except RuntimeError as exc:
+        click.echo(f"Error: {exc}", err=True)
+        sys.exit(1)
+
+    if not hits:
+        click.echo("No matches. (Run `history reindex` if sessions were archived before search existed.)")
+        return
+    for hit in hits:
+        click.echo(f"{hit.session}/{hit.file}:{hit.line}: {hit.snippet}")
+
+
+@show_history.command("reindex")
+@click.option("--fresh", is_flag=True, help="Discard the search database and re-read every file.")
+def reindex_history(fresh: bool):
+    """Update the history search index (history/.search.db) from history/."""
+    try:
+        sessions, read = rebuild_search_index(fresh=fresh)
+    except RuntimeError as exc:
+        click.echo(f"Error: {exc}", err=True)
+        sys.exit(1)
+    click.echo(f"Search index covers {sessions} session(s); re-read {read} file(s).")
+
+
+@cli.command()
+@click.option("--dry-run", is_flag=True, help="Only list which chapters would be re-edited.")
+@click.option("--workers", default=4, show_default=True, type=click.IntRange(min=1),
+              help="Chapters re-edited (or queued on the server) at once.")
+@click.option("--fast", is_flag=True, help="Chapter-only responses; change logs computed locally.")
+@click.option("--all", "all_", is_flag=True,
+              help="Also re-edit chapters with new rules that can't be checked locally.")
+@server_option
+def reapply(dry_run: bool, workers: int, fast: bool, all_: bool, server: str | None):
+    """Re-edit archived chapters that the current preferences' new rules touch.
+
+    Each archived final.md is checked locally against the rules added since
+    the preferences version it was produced under; unaffected chapters are
+    skipped without any API call. New plain-English rules can't be checked
+    that way: they are listed, and chapters they may apply to are only
+    re-edited with --all (until then they aren't marked checked). With
+    --server the re-edits run there as background jobs, behind authors' edits.
+    """
+    preferences = load_preferences()
+    if not preferences:
+        click.echo("No preferences yet — nothing to reapply.")
+        return
+
+    candidates = plan_reapply(preferences)
+    affected = [c for c in candidates if c.affected]
+    click.echo(f"Checked {len(candidates)} archived chapter(s): {len(affected)} affected by new rules.")
+    for c in affected:
+        hits = ", ".join(f"{label} ×{n}" for label, n in c.hits.items())
+        click.echo(f"  {c.name}: {hits}")
+
+    unchecked = [c for c in candidates if c.unchecked and not c.affected]
+    if unchecked:
+        rules = dict.fromkeys(e for c in unchecked for e in c.unchecked)
+        click.echo(f"{len(unchecked)} other chapter(s) have new rules that can't be checked locally:")
+        for rule in rules:
+            first = rule.splitlines()[0]
+            click.echo(f"  - {first[:77] + '...' if len(first) > 80 else first}")
+        if not all_:
+            click.echo("Those chapters stay unchecked; run with --all to re-edit them too.")
+
+    if dry_run:
+        return
+
+    def done(candidate, folder, error):
+        if error:
+            click.echo(f"  Failed {candidate.name}: {error}", err=True)
+        else:
+            click.echo(f"  Re-edited {candidate.name} -> {folder.name}")
+
+    if server:
+        created = _reapply_on_server(server, affected + (unchecked if all_ else []), workers, fast, done)
+    else:
+        created = reapply_affected(candidates, preferences, workers=workers, fast=fast,
+                                   include_unchecked=all_, on_done=done)
+    mark_checked(candidates, preferences)
+    selected = len(affected) + (len(unchecked) if all_ else 0)
+    click.echo(f"Re-edited {len(created)} chapter(s); skipped {len(candidates) - selected}.")
+
+
+def _reapply_on_server(
+    server: str,
+    selected: list[Candidate],
+    workers: int,
+    fast: bool,
+    done: Callable[[Candidate, Path | None, Exception | None], None],
+) -> list[Path]:
+    """Re-edit the selected sessions as background jobs on the server."""
+    created = []
+
+    def finished(i, job, error):
+        folder = Path(job["result"]["archive"]) if job and not error else None
+        if folder:
+            created.append(folder)
+        done(selected[i], folder, error)
+
+    bodies = [{"task": "reapply", "session": c.name, "fast": fast} for c in selected]
+    try:
+        run_jobs(server, bodies, window=workers, on_done=finished)
+    except RuntimeError as exc:
+        click.echo(f"Error: {exc}", err=True)
+        sys.exit(1)
+    return created
+
+
+@cli.command()
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8765, show_default=True, type=int)
+@click.option("--workers", default=None, type=click.IntRange(min=1),
+              help="Jobs run at once (default: twice EDITOR_MAX_CONCURRENT).")
+def serve(host: str, port: int, workers: int):
+    """Run the local HTTP job server for multiple editors.
+
+    Submit chapters with POST /jobs and poll GET /jobs/<id> for results.
+    """
+    httpd, jobs = make_server(host, port, workers)
+    jobs.start()
+    click.echo(f"Serving on http://{host}:{httpd.server_port} with {jobs.workers} worker(s), "
+               f"up to {jobs.max_background} for background jobs. Ctrl+C to stop.")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        click.echo("\nShutting down...")
+    finally:
+        httpd.server_close()
+        jobs.stop()
+
+
+@cli.command()
+@click.option("--server", envvar="EDITOR_SERVER", show_envvar=True, metavar="URL",
+              default=DEFAULT_SERVER, show_default=True, help="The running job server.")
+def metrics(server: str):
+    """Show a running job server's queue depths and wait times."""
+    try:
+        data = request_json(server, "/metrics", timeout=5)
+    except RuntimeError as exc:
+        click.echo(f"Error: couldn't read metrics: {exc}", err=True)
+        sys.exit(1)
+
+    sched = data["scheduler"]
+    budget = sched["token_budget"] or "unlimited"
+    click.echo(f"Claude calls: {sched['running']}/{sched['max_concurrent']} running, "
+               f"{sched['tokens_in_flight']} tokens in flight (budget {budget})")
+    for cls, s in sched["classes"].items():
+        click.echo(f"  {cls:<12} queued {s['queued']:>3}  running {s['running']:>2}  done {s['completed']:>4}  "
+                   f"preempted {s['preempted']:>3}  wait avg {s['wait_avg_s']:.2f}s max {s['wait_max_s']:.2f}s")
+    jobs = data["jobs"]
+    click.echo("Jobs: " + ", ".join(f"{status} {n}" for status, n in jobs.items()))
+
+
+@cli.command("index")
+def reindex():
+    """Rebuild the whole-book consistency index from history/."""
+    count = rebuild_index()
+    click.echo(f"Indexed {count} archived session(s).")
+
+
 @cli.command()
 @click.confirmation_option(prompt="Delete authorpreferences.md and start fresh?")
 def reset():
@@ -0,0 +1,98 @@
+"""Submit work to a running job server (`serve`) and wait for it.
+
+With --server (or EDITOR_SERVER) the CLI sends its Claude work to the
+server instead of calling Claude itself, so an author's edits, reapply and
+preferences rebuild share the server's scheduler (see server.py).
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from typing import Callable
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+DEFAULT_SERVER = "http://127.0.0.1:8765"
+POLL_SECONDS = 0.5
+FINISHED = ("done", "failed")
+
+
+class JobError(RuntimeError):
+    """The server rejected a job, lost track of it, or the job failed."""
+
+
+def request_json(server: str, path: str, body: dict | None = None, timeout: float = 10) -> dict:
+    """GET (or POST body to) server + path and return the JSON reply.
+
+    Raises JobError for an HTTP error reply, RuntimeError if the server
+    can't be reached.
+    """
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    req = Request(server.rstrip("/") + path, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urlopen(req, timeout=timeout) as response:
+            return json.loads(response.read())
+    except HTTPError as exc:
+        try:
+            message = json.loads(exc.read()).get("error", exc.reason)
+        except ValueError:
+            message = exc.reason
+        raise JobError(f"job server: {message}") from exc
+    except (URLError, OSError, ValueError) as exc:
+        raise RuntimeError(f"couldn't reach the job server at {server}: {exc}") from exc
+
+
+def submit_job(server: str, body: dict) -> str:
+    """Queue a job and return its id."""
+    return request_json(server, "/jobs", body)["id"]
+
+
+def run_jobs(
+    server: str,
+    bodies: list[dict],
+    window: int = 4,
+    on_done: Callable[[int, dict | None, Exception | None], None] | None = None,
+) -> None:
+    """Run jobs on the server, keeping at most window of them submitted at once.
+
+    Each job is reported through on_done with its index in bodies and either
+    the finished job or the JobError that stopped it.
+    """
+    queued = list(enumerate(bodies))
+    running: dict[str, int] = {}  # job id -> index
+
+    def report(i: int, job: dict | None, error: Exception | None) -> None:
+        if on_done:
+            on_done(i, job, error)
+
+    while queued or running:
+        while queued and len(running) < max(1, window):
+            i, body = queued.pop(0)
+            try:
+                running[submit_job(server, body)] = i
+            except JobError as exc:
+                report(i, None, exc)
+        if not running:
+            continue
+        time.sleep(POLL_SECONDS)
+        for job_id, i in list(running.items()):
+            try:
+                job = request_json(server, f"/jobs/{job_id}")
+            except JobError as exc:  # e.g. evicted by the server
+                del running[job_id]
+                report(i, None, exc)
+                continue
+            if job["status"] in FINISHED:
+                del running[job_id]
+                report(i, job, JobError(job["error"]) if job["status"] == "failed" else None)
+
+
+def run_job(server: str, body: dict) -> dict:
+    """Run one job on the server and return it once done. Raises JobError if it fails."""
+    outcome: list[tuple[dict | None, Exception | None]] = []
+    run_jobs(server, [body], on_done=lambda i, job, error: outcome.append((job, error)))
+    job, error = outcome[0]
+    if error:
+        raise error
+    return job
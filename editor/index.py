@@ -0,0 +1,245 @@
+"""Whole-book consistency index built from archived finals.
+
+Each archived session's final.md is reduced to a few counters (word and
+phrase frequencies, character-name occurrences) and stored in
+history/.index.json. The index is updated incrementally after every archive,
+and a compact summary of it is sent with each edit so the model knows how
+the rest of the book uses a term without seeing the other chapters.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+
+from editor.archive import read_session_meta
+from editor.profile import HISTORY_DIR, read_file, write_file
+from editor.rules import Rule, count_matches, extract_rules
+from editor.text import words
+
+INDEX_VERSION = 1
+
+# Phrases are only kept if they repeat within a chapter, to bound index size.
+MIN_PHRASE_COUNT = 2
+# A phrase used in at least this many other chapters is worth flagging.
+MIN_PHRASE_CHAPTERS = 3
+MAX_NAMES = 8
+MAX_PHRASES = 10
+
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from had has have he her his i if in into is it its "
+    "me my no not of on or our she so that the their them then there they this to up was "
+    "we were what when which who will with you your".split()
+)
+# Serialises read-modify-write of the index file (server workers, reapply)
+_index_lock = threading.Lock()
+_SENTENCE_END_RE = re.compile(r"[.!?\"'”’:]\s*$")
+
+
+def _index_path() -> Path:
+    return HISTORY_DIR / ".index.json"
+
+
+def load_index() -> dict:
+    """Load the index. Returns an empty index if missing or unreadable."""
+    text = read_file(_index_path())
+    if text:
+        try:
+            data = json.loads(text)
+            if data.get("version") == INDEX_VERSION:
+                return data
+        except json.JSONDecodeError:
+            pass
+    return {"version": INDEX_VERSION, "chapters": {}}
+
+
+def save_index(index: dict) -> None:
+    write_file(_index_path(), json.dumps(index, separators=(",", ":")))
+
+
+def chapter_stats(text: str) -> dict:
+    """Reduce one chapter to word, term, name and repeated-phrase counts."""
+    tokens = words(text)
+    lower = [t.lower() for t in tokens]
+
+    phrases: Counter[str] = Counter()
+    for n in (2, 3):
+        for i in range(len(lower) - n + 1):
+            gram = lower[i:i + n]
+            if all(w in _STOPWORDS for w in gram):
+                continue
+            phrases[" ".join(gram)] += 1
+
+    return {
+        "words": len(tokens),
+        "terms": dict(Counter(w for w in lower if w not in _STOPWORDS)),
+        "names": dict(_names(text, tokens)),
+        "phrases": {p: c for p, c in phrases.items() if c >= MIN_PHRASE_COUNT},
+    }
+
+
+def _names(text: str, tokens: list[str]) -> Counter[str]:
+    """Count capitalised words that never appear in lower case (likely names).
+
+    Only words seen capitalised mid-sentence qualify; once a word qualifies,
+    its sentence-initial occurrences count too.
+    """
+    lowercase_seen = {t.lower() for t in tokens if t[0].islower()}
+    occurrences: list[tuple[str, bool]] = []
+    for match in re.finditer(r"\b[A-Z][a-z][A-Za-z'’-]*", text):
+        word = match.group(0).rstrip("'’")
+        if word.endswith(("'s", "’s")):
+            word = word[:-2]
+        if word.lower() in _STOPWORDS or word.lower() in lowercase_seen:
+            continue
+        before = text[max(0, match.start() - 3):match.start()]
+        initial = match.start() == 0 or bool(_SENTENCE_END_RE.search(before)) or before.endswith("\n")
+        occurrences.append((word, initial))
+
+    qualified = {word for word, initial in occurrences if not initial}
+    return Counter(word for word, _ in occurrences if word in qualified)
+
+
+def update_index(folder: Path) -> bool:
+    """Add (or refresh) one archived session in the index.
+
+    Returns False if the session has no final.md or original.md to index.
+    """
+    text = read_file(folder / "final.md") or read_file(folder / "original.md")
+    if not text:
+        return False
+    stats = {**chapter_stats(text), "text_chars": len(text)}
+    with _index_lock:
+        index = load_index()
+        index["chapters"][folder.name] = stats
+        save_index(index)
+    return True
+
+
+def add_chapter(index: dict, name: str, text: str, preferences: str) -> None:
+    """Add a chapter that isn't archived (e.g. a unit of the current manuscript) to an in-memory index."""
+    index["chapters"][name] = {
+        **chapter_stats(text),
+        "text_chars": len(text),
+        "pref_terms": {r.key: count_matches(text, r) for r in _term_rules(preferences)},
+    }
+
+
+def _term_rules(preferences: str) -> list[Rule]:
+    # Lint patterns need full text, which the index doesn't keep
+    return [r for r in extract_rules(preferences) if r.term]
+
+
+def _fill_term_counts(index: dict, rules: list[Rule]) -> bool:
+    """Count preference terms a chapter hasn't been counted for yet. Returns True if any were added.
+
+    The phrase table only keeps phrases repeated within a chapter, so
+    multi-word terms are counted from the archived text itself, once per
+    chapter and term.
+    """
+    changed = False
+    for name, stats in index["chapters"].items():
+        counts = stats.setdefault("pref_terms", {})
+        missing = [r for r in rules if r.key not in counts]
+        if not missing:
+            continue
+        folder = HISTORY_DIR / name
+        text = read_file(folder / "final.md") or read_file(folder / "original.md")
+        for rule in missing:
+            if text:
+                counts[rule.key] = count_matches(text, rule)
+            else:  # text gone: best effort from the counters
+                term = " ".join(words(rule.term.lower()))
+                counts[rule.key] = stats["terms" if " " not in term else "phrases"].get(term, 0)
+        changed = True
+    return changed
+
+
+def remove_from_index(name: str) -> None:
+    """Drop a session from the index (e.g. once it has been superseded)."""
+    with _index_lock:
+        index = load_index()
+        if index["chapters"].pop(name, None) is not None:
+            save_index(index)
+
+
+def rebuild_index() -> int:
+    """Rebuild the index from every current session in history/.
+
+    Sessions superseded by a re-edit are skipped. Returns sessions indexed.
+    """
+    save_index({"version": INDEX_VERSION, "chapters": {}})
+    if not HISTORY_DIR.exists():
+        return 0
+    count = 0
+    for folder in sorted(HISTORY_DIR.iterdir()):
+        if not folder.is_dir() or folder.name.startswith("."):
+            continue
+        if read_session_meta(folder).get("superseded_by"):
+            continue
+        count += update_index(folder)
+    return count
+
+
+def book_summary(text: str, preferences: str, index: dict | None = None) -> str:
+    """Build a compact cross-chapter summary for the chapter being edited.
+
+    Covers: how often each preference term is used book-wide vs. here, the
+    main characters, and phrases this chapter shares with many others.
+    Returns '' if nothing has been indexed yet. Term counts missing from the
+    index are filled in (and saved, unless an in-memory index was passed).
+    """
+    rules = _term_rules(preferences)
+    if index is None:
+        with _index_lock:
+            index = load_index()
+            if _fill_term_counts(index, rules):
+                save_index(index)
+    else:
+        _fill_term_counts(index, rules)
+    chapters = index["chapters"]
+    if not chapters:
+        return ""
+
+    total_words = sum(c["words"] for c in chapters.values())
+    lines = [f"Indexed {len(chapters)} earlier chapter(s), {total_words:,} words."]
+
+    current = chapter_stats(text)
+
+    terms = []
+    for rule in rules:
+        here = count_matches(text, rule)
+        per_chapter = [c["pref_terms"].get(rule.key, 0) for c in chapters.values()]
+        elsewhere = sum(per_chapter)
+        if here or elsewhere:
+            used_in = sum(1 for n in per_chapter if n)
+            terms.append(f'- "{rule.term}": {elsewhere} time(s) in {used_in} earlier chapter(s); {here} here')
+    if terms:
+        lines.append("Preference terms:")
+        lines.extend(terms)
+
+    names: Counter[str] = Counter()
+    for c in chapters.values():
+        names.update(c["names"])
+    names.update(current["names"])
+    if names:
+        top = ", ".join(f"{n} ({c})" for n, c in names.most_common(MAX_NAMES))
+        lines.append(f"Characters by mentions: {top}")
+
+    shared = []
+    for phrase, here in current["phrases"].items():
+        if len(phrase.split()) < 3:
+            continue
+        used_in = sum(1 for c in chapters.values() if phrase in c["phrases"])
+        if used_in >= MIN_PHRASE_CHAPTERS:
+            shared.append((used_in, here, phrase))
+    if shared:
+        shared.sort(reverse=True)
+        lines.append("Phrases repeated across chapters (also used here):")
+        lines.extend(f'- "{p}": {n} earlier chapter(s); {h} here' for n, h, p in shared[:MAX_PHRASES])
+
+    return "\n".join(lines)
+
@@ -0,0 +1,194 @@
+"""Stream whole-book manuscripts one chapter or scene at a time."""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator
+
+from editor.analyzer import edit_ai_only
+from editor.index import add_chapter, book_summary, load_index
+
+# "# Chapter 5", "## The Throat of It", and bare title-like lines such as
+# "Chapter 12", "CHAPTER TWELVE" or "Chapter 5: The Throat of It" — but not
+# prose like "Chapter and verse, he knew."
+CHAPTER_HEADING_RE = re.compile(
+    r"^(?:#{1,2}[ \t]+\S.*|chapter[ \t]+[\w-]+(?:[ \t]*[:\u2014\u2013-].*)?)[ \t]*$",
+    re.IGNORECASE,
+)
+# A bare "Chapter ..." line longer than this is prose, not a heading
+MAX_BARE_HEADING_CHARS = 80
+# "# Chapter 5", "# CHAPTER FIVE: ..." — a top-level heading that names a chapter
+NAMED_CHAPTER_RE = re.compile(r"^#[ \t]+chapter\b", re.IGNORECASE)
+# "***", "* * *", "#", "~~~", "---" on a line of their own
+SCENE_BREAK_RE = re.compile(r"^[ \t]*(?:\*[ \t]*\*[ \t]*\*[ \t*]*|#|~{3,}|-{3,})[ \t]*$")
+
+UNITS = ("chapter", "scene")
+
+
+@dataclass
+class Unit:
+    """One chapter or scene of a manuscript."""
+
+    index: int
+    title: str
+    text: str
+    # Scene-break line that preceded this unit in the source ('' for chapters)
+    separator: str = ""
+    # Text before the first chapter heading (title page, dedication, ...)
+    front_matter: bool = False
+
+
+def is_chapter_heading(line: str) -> bool:
+    """True for a '#'/'##' heading or a short, title-like 'Chapter N' line."""
+    line = line.strip()
+    if not CHAPTER_HEADING_RE.match(line):
+        return False
+    return line.startswith("#") or len(line) <= MAX_BARE_HEADING_CHARS
+
+
+def heading_level(line: str) -> int:
+    """Markdown heading level of a line (0 for a bare 'Chapter N' or non-heading)."""
+    line = line.strip()
+    return len(line) - len(line.lstrip("#"))
+
+
+def chapter_heading_level(path: Path) -> int:
+    """Whether a manuscript's chapters are '#' (1) or '##' (2) headings.
+
+    Chapters are '#' when the file has several '#' headings or one that names
+    a chapter; a lone '#' heading is just the book title, with '##' chapters.
+    """
+    top = 0
+    with path.open(encoding="utf-8-sig") as fh:
+        for line in fh:
+            if heading_level(line) == 1 and is_chapter_heading(line):
+                if NAMED_CHAPTER_RE.match(line.strip()):
+                    return 1
+                top += 1
+    return 1 if top >= 2 else 2
+
+
+def iter_units(path: Path, unit: str = "chapter") -> Iterator[Unit]:
+    """Yield a manuscript's chapters (or scenes) lazily, one at a time.
+
+    The file is read line by line, so only the current unit is held in
+    memory regardless of the manuscript's size. Units with no text (e.g.
+    blank front matter) are skipped. Consecutive headings ("# Chapter 5"
+    then "## The Throat of It", or a part title before a chapter) stay
+    together with the text that follows them. Text before the first chapter
+    heading is yielded with front_matter=True.
+
+    In a manuscript whose chapters are '#' headings, '##' headings are
+    sections within a chapter: body text for unit="chapter", and the start
+    of a new scene for unit="scene".
+    """
+    if unit not in UNITS:
+        raise ValueError(f"unit must be one of {UNITS}, got {unit!r}")
+
+    chapter_level = chapter_heading_level(path)
+    index = 0
+    lines: list[str] = []
+    separator = ""
+    has_body = False  # the buffered lines hold more than headings
+    seen_heading = False
+
+    def flush(front_matter: bool = False) -> Unit | None:
+        nonlocal index
+        text = "".join(lines).strip()
+        if not text:
+            return None
+        index += 1
+        title = text.splitlines()[0].lstrip("# ").strip()[:60]
+        return Unit(index, title, text, separator, front_matter)
+
+    # utf-8-sig: PowerShell-written files start with a BOM
+    with path.open(encoding="utf-8-sig") as fh:
+        for line in fh:
+            if heading_level(line) > chapter_level:  # a section inside a chapter
+                if unit == "scene" and has_body:
+                    done = flush()
+                    if done:
+                        yield done
+                    lines, separator, has_body = [], "", False
+            elif is_chapter_heading(line):
+                if has_body or not seen_heading:
+                    done = flush(front_matter=not seen_heading)
+                    if done:
+                        yield done
+                    lines, separator, has_body = [], "", False
+                seen_heading = True
+            elif unit == "scene" and SCENE_BREAK_RE.match(line):
+                done = flush()
+                if done:
+                    yield done
+                lines, separator, has_body = [], line.strip(), False
+                continue
+            elif line.strip():
+                has_body = True
+            lines.append(line)
+
+    done = flush()
+    if done:
+        yield done
+
+
+def edit_manuscript(
+    path: Path,
+    final_path: Path,
+    reasoning_path: Path,
+    preferences: str,
+    unit: str = "chapter",
+    speculative: bool = False,
+    fast: bool = False,
+    start: int = 1,
+    on_unit: Callable[[Unit], None] | None = None,
+) -> int:
+    """Edit a manuscript unit by unit in AI-only mode, streaming results to disk.
+
+    Each edited unit is appended to final_path and its reasoning to
+    reasoning_path as soon as it is done, so memory stays bounded by one unit
+    and an interrupted run can be resumed with start=<next unit>. Every unit
+    gets a book-context summary from the history index plus the units of
+    this manuscript edited so far. Front matter is copied through unedited.
+
+    Returns the number of units edited.
+    """
+    mode = "a" if start > 1 else "w"
+    final_path.parent.mkdir(parents=True, exist_ok=True)
+    reasoning_path.parent.mkdir(parents=True, exist_ok=True)
+
+    index = load_index()
+    edited = 0
+    with final_path.open(mode, encoding="utf-8") as final_out, \
+            reasoning_path.open(mode, encoding="utf-8") as reasoning_out:
+        for u in iter_units(path, unit):
+            name = f"{path.name} {unit} {u.index}"
+            if u.index < start:
+                if not u.front_matter:  # edited in an earlier run; its original will do
+                    add_chapter(index, name, u.text, preferences)
+                continue
+            if on_unit:
+                on_unit(u)
+
+            if u.index > 1:
+                final_out.write(f"\n\n{u.separator}\n\n" if u.separator else "\n\n")
+            if u.front_matter:
+                final_out.write(u.text)
+                final_out.flush()
+                continue
+
+            reasoning, final = edit_ai_only(
+                u.text, preferences, speculative=speculative, fast=fast,
+                book_context=book_summary(u.text, preferences, index),
+            )
+
+            final_out.write(final)
+            final_out.flush()
+            add_chapter(index, name, final, preferences)
+            reasoning_out.write(f"## {unit.title()} {u.index}: {u.title}\n\n{reasoning}\n\n")
+            reasoning_out.flush()
+            edited += 1
+
+    return edited
@@ -0,0 +1,166 @@
+"""Incremental parser for Claude's reasoning / ===FINAL=== / chapter output."""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+
+DELIMITER = "===FINAL==="
+
+# Near-miss spellings of the delimiter on a line of their own, e.g.
+# "=== FINAL ===", "==FINAL==", "**===FINAL===**", "## ===FINAL CHAPTER===".
+_NEAR_MISS_RE = re.compile(
+    r"^[\s>#*_`]*[=\-]{2,}\s*FINAL(?:\s+CHAPTER)?\s*[=\-]*[\s*_`]*$"
+    r"|^[\s>#*_`]*FINAL(?:\s+CHAPTER)?\s*[=\-]{2,}[\s*_`]*$",
+    re.IGNORECASE,
+)
+
+# Change-log labels that never start a line of prose: headings ("## Reasoning",
+# "**REASONING**", a bare "Reasoning:" line), "OUTPUT 1 —" labels and "Change 3:".
+_REASONING_MARKER_RE = re.compile(
+    r"^[ \t]*(?:"
+    r"(?:#+[ \t]*|\*\*[ \t]*)+REASONING\b"
+    r"|REASONING[ \t]*[:\u2014\u2013-]?[ \t]*(?:\*\*)?[ \t]*$"
+    r"|(?:#+[ \t]*)?(?:\*\*)?OUTPUT[ \t]*[12](?:[ \t]*[:\u2014\u2013-]|[ \t]*(?:\*\*)?[ \t]*$)"
+    r"|(?:#+[ \t]*)?(?:\*\*)?Change[ \t]+\d+[ \t]*:"
+    r")",
+    re.IGNORECASE | re.MULTILINE,
+)
+# "Before:" / "After:" labels only count as change log when both are present.
+_BEFORE_LABEL_RE = re.compile(r"^[ \t]*(?:[-*][ \t]*)?(?:\*\*)?(?:Before|Original)[ \t]*:", re.IGNORECASE | re.MULTILINE)
+_AFTER_LABEL_RE = re.compile(r"^[ \t]*(?:[-*][ \t]*)?(?:\*\*)?(?:After|Changed to)[ \t]*:", re.IGNORECASE | re.MULTILINE)
+
+# Length ratio (final / original) outside which the chapter is suspect.
+MIN_LENGTH_RATIO = 0.6
+MAX_LENGTH_RATIO = 1.4
+# Below this many original chars the ratio check is meaningless.
+MIN_RATIO_CHARS = 1000
+
+
+@dataclass
+class ParsedOutput:
+    """Result of parsing one Claude edit response."""
+
+    reasoning: str
+    final: str
+    delimiter_found: bool
+    problems: list[str] = field(default_factory=list)
+
+    @property
+    def missing_final(self) -> bool:
+        return not self.final
+
+    @property
+    def missing_reasoning(self) -> bool:
+        return not self.reasoning
+
+
+class OutputParser:
+    """Consume response text chunk by chunk and split reasoning from chapter.
+
+    The delimiter (or a near-miss variant) is recognised even when it is split
+    across chunk boundaries: text before the delimiter is held one line at a
+    time until the line is complete; once the delimiter is seen, everything
+    after it streams straight into the chapter buffer.
+    """
+
+    def __init__(self) -> None:
+        self._reasoning: list[str] = []
+        self._final: list[str] = []
+        self._pending = ""
+        self.delimiter_found = False
+        self.fed = False
+
+    def feed(self, chunk: str) -> None:
+        """Consume the next piece of response text."""
+        if not chunk:
+            return
+        self.fed = True
+
+        if self.delimiter_found:
+            self._final.append(chunk)
+            return
+
+        self._pending += chunk
+        while not self.delimiter_found and "\n" in self._pending:
+            line, self._pending = self._pending.split("\n", 1)
+            self._consume_line(line + "\n")
+
+        if self.delimiter_found and self._pending:
+            self._final.append(self._pending)
+            self._pending = ""
+
+    def close(self) -> ParsedOutput:
+        """Flush buffered text and return the parsed sections."""
+        if self._pending:
+            pending, self._pending = self._pending, ""
+            if self.delimiter_found:
+                self._final.append(pending)
+            else:
+                self._consume_line(pending)
+
+        reasoning = "".join(self._reasoning).strip()
+        final = "".join(self._final).strip()
+
+        if self.delimiter_found:
+            return ParsedOutput(reasoning, final, True)
+
+        # No delimiter: decide which section we actually got.
+        if looks_like_reasoning(reasoning):
+            return ParsedOutput(reasoning, "", False)
+        return ParsedOutput("", reasoning, False)
+
+    def _consume_line(self, line: str) -> None:
+        if _NEAR_MISS_RE.match(line.strip()):
+            self.delimiter_found = True
+        elif DELIMITER in line:
+            before, after = line.split(DELIMITER, 1)
+            self._reasoning.append(before)
+            self._final.append(after)
+            self.delimiter_found = True
+        else:
+            self._reasoning.append(line)
+
+
+def parse_output(raw: str) -> ParsedOutput:
+    """Parse a complete (non-streamed) response."""
+    parser = OutputParser()
+    parser.feed(raw)
+    return parser.close()
+
+
+def _reasoning_marker(text: str) -> str:
+    """The first change-log marker in text, or '' if there is none."""
+    match = _REASONING_MARKER_RE.search(text)
+    if match:
+        return match.group(0).strip()
+    before = _BEFORE_LABEL_RE.search(text)
+    if before and _AFTER_LABEL_RE.search(text):
+        return before.group(0).strip()
+    return ""
+
+
+def looks_like_reasoning(text: str) -> bool:
+    """True if text contains change-log markers such as 'OUTPUT 1 —' or paired 'Before:'/'After:'."""
+    return bool(_reasoning_marker(text))
+
+
+def validate_final(final: str, original: str) -> list[str]:
+    """Check a final chapter against its original. Returns a list of problems."""
+    if not final:
+        return ["final chapter is empty"]
+
+    problems = []
+    if len(original) >= MIN_RATIO_CHARS:
+        ratio = len(final) / len(original)
+        if ratio < MIN_LENGTH_RATIO or ratio > MAX_LENGTH_RATIO:
+            problems.append(f"length ratio {ratio:.2f} vs original is outside "
+                            f"{MIN_LENGTH_RATIO}-{MAX_LENGTH_RATIO}")
+
+    marker = _reasoning_marker(final)
+    if marker:
+        problems.append(f"reasoning marker left in chapter: {marker!r}")
+    if DELIMITER in final:
+        problems.append("delimiter left in chapter")
+
+    return problems
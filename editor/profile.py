@@ -4,6 +4,8 @@ from __future__ import annotations
 
 from pathlib import Path
 
+from editor.trace import span
+
 # All paths relative to the repo root
 ROOT = Path(__file__).resolve().parent.parent
 
@@ -12,15 +14,18 @@ EDITED_PATH = ROOT / "edited.md"
 AIEDITED_PATH = ROOT / "aiedited.md"
 FINAL_PATH = ROOT / "final.md"
 PREFERENCES_PATH = ROOT / "authorpreferences.md"
+PREFERENCES_BACKUP_PATH = ROOT / "authorpreferences.prev.md"
 HISTORY_DIR = ROOT / "history"
+OUTPUT_DIR = ROOT / "output"
 
 
 def read_file(path: Path) -> str:
     """Read a file and return its stripped content. Returns '' if missing or empty."""
-    if not path.exists():
-        return ""
-    text = path.read_text(encoding="utf-8").strip()
-    return text
+    with span("read_file", file=path.name):
+        if not path.exists():
+            return ""
+        text = path.read_text(encoding="utf-8").strip()
+        return text
 
 
 def write_file(path: Path, content: str) -> None:
@@ -59,6 +64,29 @@ def save_preferences(content: str) -> None:
     write_file(PREFERENCES_PATH, content)
 
 
+def backup_preferences() -> bool:
+    """Copy authorpreferences.md to authorpreferences.prev.md. Returns False if there was nothing to back up."""
+    current = read_file(PREFERENCES_PATH)
+    if not current:
+        return False
+    write_file(PREFERENCES_BACKUP_PATH, current)
+    return True
+
+
+def rollback_preferences() -> bool:
+    """Swap authorpreferences.md with its backup. Returns False if there is no backup."""
+    previous = read_file(PREFERENCES_BACKUP_PATH)
+    if not previous:
+        return False
+    current = read_file(PREFERENCES_PATH)
+    write_file(PREFERENCES_PATH, previous)
+    if current:
+        write_file(PREFERENCES_BACKUP_PATH, current)
+    else:
+        PREFERENCES_BACKUP_PATH.unlink()
+    return True
+
+
 def reset_preferences() -> bool:
     """Delete authorpreferences.md. Returns True if file existed."""
     if PREFERENCES_PATH.exists():
@@ -0,0 +1,164 @@
+"""Re-edit only the archived chapters that new preference rules touch.
+
+Every archived session records the preferences version its final.md was
+produced (or last checked) under. When authorpreferences.md changes, the
+rules added since that version are matched locally (rules.py) against the
+session's final.md; only sessions with hits are re-edited, in parallel and
+at bulk priority (see scheduler.py). New rules that can't be matched
+locally (plain-English guidance) are reported per session instead; such a
+session is only re-edited on request and is never marked checked. Each re-edit is archived as a new
+AI-only session and the old one is marked superseded, so later runs and the
+index only see the newest version.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from editor.analyzer import edit_ai_only, start_call_log
+from editor.archive import (
+    archive_texts,
+    find_session,
+    list_history,
+    load_preferences_snapshot,
+    read_session_meta,
+    snapshot_preferences,
+    write_session_meta,
+)
+from editor.index import book_summary, load_index, remove_from_index, update_index
+from editor.profile import read_file
+from editor.rules import count_matches, extract_rules, split_entries, unmatched_entries
+from editor.scheduler import priority
+from editor.search import update_search_index
+
+
+@dataclass
+class Candidate:
+    """An archived session and the new rules its final.md matches."""
+
+    name: str
+    path: Path
+    hits: dict[str, int] = field(default_factory=dict)  # rule label -> matches
+    # New rule entries that can't be checked locally; they may or may not apply
+    unchecked: list[str] = field(default_factory=list)
+
+    @property
+    def affected(self) -> bool:
+        return bool(self.hits)
+
+
+def plan_reapply(preferences: str) -> list[Candidate]:
+    """Check every current archived final.md against the rules new since its version.
+
+    Sessions already produced under the current preferences are left out.
+    Sessions from before version tracking count every current rule as new.
+    """
+    version = snapshot_preferences(preferences)
+    current_rules = extract_rules(preferences)
+    current_unmatched = unmatched_entries(preferences)
+    candidates = []
+
+    for session in list_history():
+        path = Path(session["path"])
+        if "final.md" not in session["files"]:
+            continue
+        meta = read_session_meta(path)
+        if meta.get("superseded_by"):
+            continue
+        old_version = meta.get("rules_checked_version") or meta.get("preferences_version")
+        if old_version == version:
+            continue
+
+        old_prefs = load_preferences_snapshot(old_version) if old_version else ""
+        old_keys = {r.key for r in extract_rules(old_prefs)}
+        old_entries = set(split_entries(old_prefs))
+        new_rules = [r for r in current_rules if r.key not in old_keys]
+        final = read_file(path / "final.md")
+        hits = {r.label: n for r in new_rules if (n := count_matches(final, r))}
+        unchecked = [e for e in current_unmatched if e not in old_entries]
+        candidates.append(Candidate(session["name"], path, hits, unchecked))
+
+    return candidates
+
+
+def mark_checked(candidates: list[Candidate], preferences: str) -> None:
+    """Record that unaffected sessions already comply with these preferences.
+
+    Sessions with new rules that couldn't be checked locally are left
+    unmarked, so those rules are reported again on the next run.
+    """
+    version = snapshot_preferences(preferences)
+    for c in candidates:
+        if not c.affected and not c.unchecked:
+            write_session_meta(c.path, {"rules_checked_version": version})
+
+
+def reapply_affected(
+    candidates: list[Candidate],
+    preferences: str,
+    workers: int = 4,
+    fast: bool = False,
+    include_unchecked: bool = False,
+    on_done: Callable[[Candidate, Path | None, Exception | None], None] | None = None,
+) -> list[Path]:
+    """Re-edit affected sessions in parallel. Returns the new archive folders.
+
+    With include_unchecked, sessions whose new rules can't be checked locally
+    are re-edited too. A failed re-edit is reported through on_done and
+    leaves its session untouched.
+    """
+    affected = [c for c in candidates if c.affected or (include_unchecked and c.unchecked)]
+    index = load_index()
+    created = []
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(_reedit, c, preferences, index, fast): c for c in affected}
+        for future in as_completed(futures):
+            candidate = futures[future]
+            try:
+                folder = future.result()
+            except Exception as exc:  # one chapter failing shouldn't stop the rest
+                if on_done:
+                    on_done(candidate, None, exc)
+                continue
+            created.append(folder)
+            if on_done:
+                on_done(candidate, folder, None)
+
+    return created
+
+
+def reedit_session(name: str, preferences: str, fast: bool = False) -> Path:
+    """Re-edit one archived session by name and return its new archive folder.
+
+    Used for the job server's reapply jobs. Raises ValueError if there is no
+    such session with a final.md.
+    """
+    path = find_session(name)
+    if path is None or not (path / "final.md").exists():
+        raise ValueError(f"no archived session {name!r} with a final.md")
+    return _reedit(Candidate(name, path), preferences, load_index(), fast)
+
+
+def _reedit(candidate: Candidate, preferences: str, index: dict, fast: bool) -> Path:
+    calls = start_call_log()
+    previous = read_file(candidate.path / "final.md")
+    # Backlist work yields to authors waiting on a chapter
+    with priority("bulk"):
+        reasoning, final = edit_ai_only(
+            previous, preferences, book_context=book_summary(previous, preferences, index), fast=fast
+        )
+    folder = archive_texts(
+        "ai",
+        {"original.md": previous, "aiedited.md": reasoning, "final.md": final},
+        meta={"calls": calls, "reapplied_from": candidate.name},
+        preferences=preferences,
+    )
+    write_session_meta(candidate.path, {"superseded_by": folder.name})
+    remove_from_index(candidate.name)
+    update_index(folder)
+    update_search_index(folder)
+    return folder
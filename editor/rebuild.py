@@ -0,0 +1,122 @@
+"""Rebuild authorpreferences.md from every archived human-feedback session.
+
+Map: each `_human` session's original/edited/final triplet is sent to
+`extract_rule_candidates` in parallel. Reduce: the per-session lists are
+merged `fan_in` at a time with `merge_preferences`, level by level, until one
+document remains.
+
+Every map and reduce result is cached under history/.rebuild/, keyed by its
+inputs, so an interrupted rebuild resumes where it stopped and a rebuild
+after new sessions only pays for the new sessions and the merges above them.
+All calls run at bulk priority (see scheduler.py).
+"""
+
+from __future__ import annotations
+
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+from editor.analyzer import extract_rule_candidates, merge_preferences
+from editor.archive import list_history
+from editor.profile import HISTORY_DIR, read_file, write_file
+from editor.scheduler import priority
+
+CACHE_DIR_NAME = ".rebuild"
+
+# on_progress(stage, done, total); stage is "map" or "reduce level N"
+Progress = Callable[[str, int, int], None]
+
+
+def _cache_dir() -> Path:
+    return HISTORY_DIR / CACHE_DIR_NAME
+
+
+def _key(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def _cached(name: str, compute: Callable[[], str]) -> str:
+    path = _cache_dir() / name
+    cached = read_file(path)
+    if cached:
+        return cached
+    result = compute()
+    if result:
+        write_file(path, result)
+    return result
+
+
+def feedback_sessions() -> list[Path]:
+    """Archived human-feedback sessions with feedback and a final, oldest first."""
+    sessions = []
+    for s in reversed(list_history()):
+        if s["mode"] == "human" and {"edited.md", "final.md"} <= set(s["files"]):
+            sessions.append(Path(s["path"]))
+    return sessions
+
+
+def _map_session(folder: Path) -> str:
+    original = read_file(folder / "original.md")
+    feedback = read_file(folder / "edited.md")
+    final = read_file(folder / "final.md")
+    name = f"map-{folder.name}-{_key(original, feedback, final)}.md"
+    with priority("bulk"):
+        return _cached(name, lambda: extract_rule_candidates(original, feedback, final))
+
+
+def _reduce_group(documents: list[str]) -> str:
+    name = f"reduce-{_key(*documents)}.md"
+    with priority("bulk"):
+        return _cached(name, lambda: merge_preferences(documents))
+
+
+def rebuild_preferences(
+    workers: int = 4,
+    fan_in: int = 4,
+    fresh: bool = False,
+    on_progress: Progress | None = None,
+) -> str:
+    """Map-reduce all feedback sessions into a new preferences document.
+
+    Returns '' if there are no feedback sessions. fresh=True clears the cache
+    first.
+    """
+    if fresh and _cache_dir().exists():
+        for path in _cache_dir().glob("*.md"):
+            path.unlink()
+
+    sessions = feedback_sessions()
+    if not sessions:
+        return ""
+    fan_in = max(2, fan_in)
+
+    def run(stage: str, fn, items: list) -> list[str]:
+        results: list[str] = [""] * len(items)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = [pool.submit(fn, item) for item in items]
+            for done, (i, future) in enumerate(enumerate(futures), 1):
+                results[i] = future.result()
+                if on_progress:
+                    on_progress(stage, done, len(items))
+        return results
+
+    documents = [d for d in run("map", _map_session, sessions) if d]
+    if not documents:
+        return ""
+
+    level = 1
+    # Always merge at least once so a single session still yields a full document
+    while len(documents) > 1 or level == 1:
+        groups = [documents[i:i + fan_in] for i in range(0, len(documents), fan_in)]
+        # A leftover single list just moves up a level unmerged
+        merge = (lambda g: g[0] if len(g) == 1 else _reduce_group(g)) if len(groups) > 1 else _reduce_group
+        documents = run(f"reduce level {level}", merge, groups)
+        level += 1
+
+    return documents[0]
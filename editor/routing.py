@@ -0,0 +1,76 @@
+"""Pick a Claude model per task type, with escalation to a stronger model."""
+
+from __future__ import annotations
+
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+STRONG_MODEL = "claude-sonnet-4-20250514"
+FAST_MODEL = "claude-3-5-haiku-20241022"
+
+# Largest max_tokens each model family accepts, matched by model-id prefix.
+# Requests asking for more are rejected by the API, so calls are clamped.
+MAX_OUTPUT_TOKENS = {
+    "claude-3-haiku": 4096,
+    "claude-3-5-haiku": 8192,
+    "claude-3-5-sonnet": 8192,
+    "claude-3-7-sonnet": 64000,
+    "claude-sonnet-4": 64000,
+    "claude-opus-4": 32000,
+}
+
+# Task type -> tier. Anything that returns a whole chapter stays on the strong
+# model: a 30k-char chapter plus its change log doesn't fit the fast model's
+# output limit. Speculative scans, preference summarisation and change-log
+# re-asks are short and go to the fast model. Compaction rewrites the
+# preferences every later edit relies on, so it gets the strong model.
+TASK_TIERS = {
+    "edit_feedback": "strong",
+    "edit_ai_only": "strong",
+    "scan": "fast",
+    "rewrite": "strong",
+    "preferences": "fast",
+    "compaction": "strong",
+    "changelog": "fast",
+    "default": "strong",
+}
+
+
+def _tier_models() -> dict[str, str]:
+    return {
+        "strong": os.getenv("EDITOR_MODEL_STRONG") or STRONG_MODEL,
+        "fast": os.getenv("EDITOR_MODEL_FAST") or FAST_MODEL,
+    }
+
+
+def model_for(task: str) -> str:
+    """Return the model to use for a task type.
+
+    EDITOR_MODEL_<TASK> (e.g. EDITOR_MODEL_EDIT_AI_ONLY) overrides the default
+    and may be either a tier name ('strong', 'fast') or a full model id.
+    """
+    tiers = _tier_models()
+    choice = os.getenv(f"EDITOR_MODEL_{task.upper()}") or TASK_TIERS.get(task, TASK_TIERS["default"])
+    return tiers.get(choice, choice)
+
+
+def max_tokens_for(model: str, requested: int) -> int:
+    """Clamp a max_tokens request to the model's output limit (unknown models are left alone)."""
+    for prefix, limit in MAX_OUTPUT_TOKENS.items():
+        if model.startswith(prefix):
+            return min(requested, limit)
+    return requested
+
+
+def escalation_for(model: str) -> str | None:
+    """Return the stronger model to retry with, or None if there is none.
+
+    Set EDITOR_ESCALATE=0 to disable escalation.
+    """
+    if os.getenv("EDITOR_ESCALATE", "1").strip().lower() in ("0", "false", "no", "off"):
+        return None
+    strong = _tier_models()["strong"]
+    return strong if model != strong else None
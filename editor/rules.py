@@ -0,0 +1,133 @@
+"""Local matcher for concrete preference rules (no API calls).
+
+authorpreferences.md is plain English, so only two kinds of rule can be
+matched locally:
+
+- Term rules: quoted words or short phrases the author flagged, e.g.
+  **Avoid overusing "lattice"** or **NEVER use "gamer"**. Before → after
+  example lines and replacement suggestions (text after "replaced with")
+  are ignored.
+- Lint rules: built-in patterns for constructions the preferences name, e.g.
+  "Not X, but Y". A lint rule applies only when the preferences mention it.
+
+Anything else ("Kenji should handle combat") can't be checked locally;
+unmatched_entries() lists those rule entries so callers can say so.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+_QUOTED_RE = re.compile(r"[\"“]([^\"”\n]{2,40})[\"”]")
+# Lines showing a before → after example quote whole sentences, not terms.
+_EXAMPLE_RE = re.compile(r"→|->|\bchanged to\b", re.IGNORECASE)
+# Everything after one of these on a line is a suggested replacement.
+_REPLACEMENT_RE = re.compile(r"\breplaced with\b|\binstead\b|\bprefer\b", re.IGNORECASE)
+# A quote right after one of these is the author's remark, not a term.
+_BULLET_RE = re.compile(r"[-*+]\s")
+_REMARK_RE = re.compile(r"(?:called it|stated(?: this)?|noted|said|wrote|commented)[\s:,]*$", re.IGNORECASE)
+MAX_TERM_WORDS = 3
+
+
+@dataclass(frozen=True)
+class Rule:
+    """A locally matchable preference rule."""
+
+    key: str
+    label: str
+    regex: str
+    source: str
+    term: str = ""
+
+    @property
+    def pattern(self) -> re.Pattern:
+        return re.compile(self.regex, re.IGNORECASE)
+
+
+# (key, label, pattern in the preferences that enables it, pattern in prose)
+LINT_RULES = [
+    (
+        "lint:not-x-but-y",
+        '"not X, but Y" construction',
+        r"not\s+X,?\s+but\s+Y|not\W+\w+\W+but\b",
+        r"\bnot\s+(?:\w+\s+){0,3}\w+,?\s+but\b",
+    ),
+    (
+        "lint:negative-contrast",
+        'negative contrast ("aren\'t X. They\'re Y.")',
+        r"negative[- ]contrast|aren't\s+\w+.{0,40}they're",
+        r"\b(?:isn't|aren't|wasn't|weren't|not)\b[^.!?\n]{0,40}[.!?][\"”]?\s+"
+        r"(?:it|they|he|she|this|that)(?:'s|'re|\s+(?:is|are|was|were))\b",
+    ),
+]
+
+
+def _term_rule(term: str, source: str) -> Rule:
+    words = [re.escape(w) for w in term.split()]
+    regex = r"\b" + r"\s+".join(words) + r"\b"
+    return Rule(f"term:{term.lower()}", f'"{term}"', regex, source, term)
+
+
+def extract_rules(preferences: str) -> list[Rule]:
+    """Extract term and lint rules from authorpreferences.md text.
+
+    Term rules come first, in document order, followed by lint rules.
+    """
+    rules: dict[str, Rule] = {}
+    for line in preferences.splitlines():
+        if _EXAMPLE_RE.search(line):
+            continue
+        flagged = _REPLACEMENT_RE.split(line, 1)[0]
+        for match in _QUOTED_RE.finditer(flagged):
+            if _REMARK_RE.search(flagged[:match.start()]):
+                continue
+            term = match.group(1).strip(" ,.;:!?'’").strip()
+            if not term or len(term.split()) > MAX_TERM_WORDS:
+                continue
+            if not re.search(r"[A-Za-z]", term):
+                continue
+            rules.setdefault(f"term:{term.lower()}", _term_rule(term, line.strip()))
+
+    for key, label, trigger, regex in LINT_RULES:
+        match = re.search(trigger, preferences, re.IGNORECASE)
+        if match:
+            start = preferences.rfind("\n", 0, match.start()) + 1
+            end = preferences.find("\n", match.end())
+            source = preferences[start:end if end != -1 else None].strip()
+            rules[key] = Rule(key, label, regex, source)
+
+    return list(rules.values())
+
+
+def split_entries(preferences: str) -> list[str]:
+    """Split authorpreferences.md into rule entries, one string each.
+
+    An entry is a **bold** rule line with the lines under it (its example
+    bullets), a top-level bullet, or a plain paragraph. Headings are dropped
+    and lines are stripped, so the same rule compares equal across versions.
+    """
+    entries: list[list[str]] = []
+    current: list[str] = []
+    for raw in preferences.splitlines():
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            current = []
+            continue
+        bullet = bool(_BULLET_RE.match(raw))
+        if not current or line.startswith("**") or (bullet and not current[0].startswith("**")):
+            current = []
+            entries.append(current)
+        current.append(line)
+    return ["\n".join(e) for e in entries if re.search(r"[A-Za-z]", "".join(e))]
+
+
+def unmatched_entries(preferences: str) -> list[str]:
+    """Rule entries that no term or lint rule covers, i.e. can't be checked locally."""
+    sources = {r.source for r in extract_rules(preferences)}
+    return [e for e in split_entries(preferences) if not sources.intersection(e.splitlines())]
+
+
+def count_matches(text: str, rule: Rule) -> int:
+    """Number of times a rule's pattern occurs in text."""
+    return len(rule.pattern.findall(text))
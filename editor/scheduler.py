@@ -0,0 +1,215 @@
+"""Priority scheduler shared by every Claude call in the process.
+
+Each call waits for a slot under one budget: at most EDITOR_MAX_CONCURRENT
+calls in flight and, if EDITOR_TOKEN_BUDGET is set, at most that many
+estimated tokens (prompt + max_tokens) in flight. Calls belong to one of
+three classes:
+
+    interactive   an author waiting on a chapter (default)
+    preferences   preference extraction / compaction (inferred from the task)
+    bulk          backlist re-edits, preference rebuilds, background jobs
+
+Free slots are shared between waiting classes by weighted fair queuing on
+token cost (weights 6:3:1), so lower classes still progress under load.
+Queued bulk calls are held back while an interactive call is waiting;
+calls already in flight are never interrupted.
+
+The class comes from the surrounding `with priority("bulk"):` block, which
+is per thread/context — worker threads must set it themselves.
+
+The CLI's --server option (or EDITOR_SERVER) sends `edit`, `reapply` and
+`preferences rebuild` to a running job server, so they all go through the
+server's scheduler.
+"""
+
+from __future__ import annotations
+
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator
+
+PRIORITY_CLASSES = ("interactive", "preferences", "bulk")
+WEIGHTS = {"interactive": 6, "preferences": 3, "bulk": 1}
+_TASK_CLASSES = {"preferences": "preferences", "compaction": "preferences"}
+
+_priority: ContextVar[str | None] = ContextVar("priority", default=None)
+
+
+@contextmanager
+def priority(cls: str) -> Iterator[None]:
+    """Run the enclosed Claude calls in the given priority class."""
+    if cls not in PRIORITY_CLASSES:
+        raise ValueError(f"priority class must be one of {PRIORITY_CLASSES}")
+    token = _priority.set(cls)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def class_for(task: str) -> str:
+    """Priority class for a call: the enclosing priority() block, else inferred from the task."""
+    return _priority.get() or _TASK_CLASSES.get(task, "interactive")
+
+
+@dataclass
+class Ticket:
+    """A call waiting for (or holding) a slot."""
+
+    cls: str
+    cost: int
+    seq: int
+    enqueued: float
+    start: float = 0.0  # virtual start tag, set once at the head of its class queue
+    admitted: bool = False
+    preempted: bool = False
+    waited: float = 0.0
+
+
+@dataclass
+class ClassStats:
+    queued: int = 0
+    running: int = 0
+    completed: int = 0
+    preempted: int = 0  # queued calls held back for interactive work
+    tokens: int = 0
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+
+
+class Scheduler:
+    """Admits calls from the three priority classes under a shared budget."""
+
+    def __init__(self, max_concurrent: int = 4, token_budget: int = 0, weights: dict[str, int] | None = None):
+        self.max_concurrent = max(1, max_concurrent)
+        self.token_budget = max(0, token_budget)
+        self.weights = {**WEIGHTS, **(weights or {})}
+        self._cond = threading.Condition()
+        self._queues: dict[str, deque[Ticket]] = {c: deque() for c in PRIORITY_CLASSES}
+        # Start-time fair queuing: each class's last virtual finish tag, and the
+        # start tag of the latest admission (so idle classes can't bank credit)
+        self._finish = {c: 0.0 for c in PRIORITY_CLASSES}
+        self._vclock = 0.0
+        self._seq = itertools.count()
+        self._running = 0
+        self._tokens = 0
+        self._stats = {c: ClassStats() for c in PRIORITY_CLASSES}
+
+    def acquire(self, cls: str, cost: int) -> Ticket:
+        """Block until a call of this class and estimated token cost may start."""
+        ticket = Ticket(cls, max(1, cost), next(self._seq), time.monotonic())
+        with self._cond:
+            if not self._queues[cls]:
+                ticket.start = max(self._finish[cls], self._vclock)
+            self._queues[cls].append(ticket)
+            self._stats[cls].queued += 1
+            self._dispatch()
+            while not ticket.admitted:
+                self._cond.wait()
+        return ticket
+
+    def release(self, ticket: Ticket) -> None:
+        """Return a finished call's slot and admit whoever is next."""
+        with self._cond:
+            self._running -= 1
+            self._tokens -= ticket.cost
+            stats = self._stats[ticket.cls]
+            stats.running -= 1
+            stats.completed += 1
+            self._dispatch()
+
+    def _fits(self, cost: int) -> bool:
+        if self._running >= self.max_concurrent:
+            return False
+        # A call bigger than the whole budget still runs, alone
+        return not self.token_budget or self._running == 0 or self._tokens + cost <= self.token_budget
+
+    def _pick(self) -> str | None:
+        waiting = [c for c in PRIORITY_CLASSES if self._queues[c]]
+        if "interactive" in waiting and "bulk" in waiting:
+            waiting.remove("bulk")
+            for ticket in self._queues["bulk"]:
+                if not ticket.preempted:
+                    ticket.preempted = True
+                    self._stats["bulk"].preempted += 1
+        if not waiting:
+            return None
+        # Earliest virtual finish first; ties go to the higher class
+        return min(waiting, key=lambda c: self._queues[c][0].start + self._queues[c][0].cost / self.weights[c])
+
+    def _dispatch(self) -> None:
+        """Admit queued calls while the budget allows. Caller holds the lock."""
+        admitted = False
+        while (cls := self._pick()) is not None:
+            ticket = self._queues[cls][0]
+            if not self._fits(ticket.cost):
+                break
+            queue = self._queues[cls]
+            queue.popleft()
+            self._vclock = ticket.start
+            self._finish[cls] = ticket.start + ticket.cost / self.weights[cls]
+            if queue:
+                queue[0].start = self._finish[cls]
+
+            ticket.admitted = True
+            ticket.waited = time.monotonic() - ticket.enqueued
+            self._running += 1
+            self._tokens += ticket.cost
+            stats = self._stats[cls]
+            stats.queued -= 1
+            stats.running += 1
+            stats.tokens += ticket.cost
+            stats.wait_total += ticket.waited
+            stats.wait_max = max(stats.wait_max, ticket.waited)
+            admitted = True
+        if admitted:
+            self._cond.notify_all()
+
+    def metrics(self) -> dict:
+        """Queue depth, in-flight work and wait times, overall and per class."""
+        now = time.monotonic()
+        with self._cond:
+            classes = {}
+            for cls, s in self._stats.items():
+                admitted = s.running + s.completed
+                oldest = self._queues[cls][0].enqueued if self._queues[cls] else None
+                classes[cls] = {
+                    "weight": self.weights[cls],
+                    "queued": s.queued,
+                    "running": s.running,
+                    "completed": s.completed,
+                    "preempted": s.preempted,
+                    "tokens": s.tokens,
+                    "wait_avg_s": round(s.wait_total / admitted, 3) if admitted else 0.0,
+                    "wait_max_s": round(s.wait_max, 3),
+                    "oldest_queued_s": round(now - oldest, 3) if oldest is not None else 0.0,
+                }
+            return {
+                "max_concurrent": self.max_concurrent,
+                "token_budget": self.token_budget,
+                "running": self._running,
+                "tokens_in_flight": self._tokens,
+                "classes": classes,
+            }
+
+
+_scheduler: Scheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> Scheduler:
+    """Return the process-wide scheduler, configured from the environment on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler(
+                max_concurrent=int(os.getenv("EDITOR_MAX_CONCURRENT", "4")),
+                token_budget=int(os.getenv("EDITOR_TOKEN_BUDGET", "0")),
+            )
+        return _scheduler
@@ -0,0 +1,207 @@
+"""Full-text search over archived sessions (SQLite FTS5).
+
+Every non-empty line of each session's original.md, edited.md, aiedited.md
+and final.md is stored in history/.search.db. Sessions are indexed as they
+are archived; `history reindex` catches up on anything added, changed or
+deleted by hand. A file is only re-read when its size or mtime changed.
+
+Hits are ranked with bm25 and come back as session/file/line with a
+highlighted snippet.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+from editor.profile import HISTORY_DIR
+
+SEARCH_DB_NAME = ".search.db"
+SEARCHED_FILES = ("original.md", "edited.md", "aiedited.md", "final.md")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    session TEXT NOT NULL,
+    file TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    PRIMARY KEY (session, file)
+);
+CREATE TABLE IF NOT EXISTS line_refs (
+    id INTEGER PRIMARY KEY,
+    session TEXT NOT NULL,
+    file TEXT NOT NULL,
+    line INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS line_refs_file ON line_refs (session, file);
+CREATE VIRTUAL TABLE IF NOT EXISTS lines USING fts5 (text, tokenize = 'unicode61 remove_diacritics 2');
+"""
+
+# Serialises writers within this process (server workers, reapply)
+_search_lock = threading.Lock()
+
+
+@dataclass
+class Hit:
+    """One matching line."""
+
+    session: str
+    file: str
+    line: int  # 1-based line number in the file
+    snippet: str
+    score: float  # bm25; lower is better
+
+
+def _db_path() -> Path:
+    return HISTORY_DIR / SEARCH_DB_NAME
+
+
+@lru_cache(maxsize=1)
+def fts5_available() -> bool:
+    """True if this Python's SQLite was built with FTS5."""
+    try:
+        sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE t USING fts5 (x)")
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def _connect() -> sqlite3.Connection:
+    if not fts5_available():
+        raise RuntimeError("History search needs SQLite with FTS5, which this Python lacks.")
+    HISTORY_DIR.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(_db_path(), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _session_files(folder: Path) -> list[Path]:
+    return [folder / name for name in SEARCHED_FILES if (folder / name).is_file()]
+
+
+def _drop_file(conn: sqlite3.Connection, session: str, file: str) -> None:
+    conn.execute(
+        "DELETE FROM lines WHERE rowid IN (SELECT id FROM line_refs WHERE session = ? AND file = ?)",
+        (session, file),
+    )
+    conn.execute("DELETE FROM line_refs WHERE session = ? AND file = ?", (session, file))
+    conn.execute("DELETE FROM files WHERE session = ? AND file = ?", (session, file))
+
+
+def _index_folder(conn: sqlite3.Connection, folder: Path) -> int:
+    """(Re)index a session's changed files. Returns the number of files read."""
+    session = folder.name
+    known = {
+        file: (size, mtime)
+        for file, size, mtime in conn.execute(
+            "SELECT file, size, mtime_ns FROM files WHERE session = ?", (session,)
+        )
+    }
+    present = set()
+    read = 0
+    for path in _session_files(folder):
+        present.add(path.name)
+        stat = path.stat()
+        if known.get(path.name) == (stat.st_size, stat.st_mtime_ns):
+            continue
+        _drop_file(conn, session, path.name)
+        text = path.read_text(encoding="utf-8")
+        for n, line in enumerate(text.splitlines(), 1):
+            if not line.strip():
+                continue
+            cursor = conn.execute(
+                "INSERT INTO line_refs (session, file, line) VALUES (?, ?, ?)", (session, path.name, n)
+            )
+            conn.execute("INSERT INTO lines (rowid, text) VALUES (?, ?)", (cursor.lastrowid, line))
+        conn.execute(
+            "INSERT INTO files (session, file, size, mtime_ns) VALUES (?, ?, ?, ?)",
+            (session, path.name, stat.st_size, stat.st_mtime_ns),
+        )
+        read += 1
+    for file in set(known) - present:
+        _drop_file(conn, session, file)
+    return read
+
+
+def update_search_index(folder: Path) -> bool:
+    """Add (or refresh) one archived session in the search index.
+
+    Returns False if the session has nothing searchable or FTS5 is missing.
+    """
+    if not _session_files(folder) or not fts5_available():
+        return False
+    with _search_lock:
+        conn = _connect()
+        try:
+            with conn:
+                _index_folder(conn, folder)
+        finally:
+            conn.close()
+    return True
+
+
+def rebuild_search_index(fresh: bool = False) -> tuple[int, int]:
+    """Bring the search index in line with history/.
+
+    Unchanged files are skipped and deleted sessions dropped; fresh=True
+    starts from an empty database. Returns (sessions, files re-read).
+    """
+    with _search_lock:
+        if fresh:
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{_db_path()}{suffix}").unlink(missing_ok=True)
+        conn = _connect()
+        try:
+            with conn:
+                folders = [
+                    f for f in sorted(HISTORY_DIR.iterdir())
+                    if f.is_dir() and not f.name.startswith(".")
+                ]
+                read = sum(_index_folder(conn, f) for f in folders)
+                current = {f.name for f in folders}
+                stale = {s for (s,) in conn.execute("SELECT DISTINCT session FROM files")} - current
+                for session in stale:
+                    for (file,) in conn.execute("SELECT file FROM files WHERE session = ?", (session,)).fetchall():
+                        _drop_file(conn, session, file)
+        finally:
+            conn.close()
+    return len(folders), read
+
+
+def _match_expression(query: str) -> str:
+    """Quote each word so punctuation in prose can't be read as FTS5 syntax."""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+
+
+def search(query: str, limit: int = 20, files: tuple[str, ...] = (), raw: bool = False) -> list[Hit]:
+    """Ranked line hits for query (all words must appear in the line).
+
+    files restricts the search to those file names. raw=True passes query
+    through as an FTS5 expression (phrases, OR, NEAR, prefix*).
+    """
+    expression = query if raw else _match_expression(query)
+    if not expression.strip() or not _db_path().exists():
+        return []
+    sql = (
+        "SELECT r.session, r.file, r.line, snippet(lines, 0, '[', ']', '…', 16), bm25(lines) "
+        "FROM lines JOIN line_refs r ON r.id = lines.rowid WHERE lines MATCH ?"
+    )
+    params: list = [expression]
+    if files:
+        sql += f" AND r.file IN ({', '.join('?' * len(files))})"
+        params.extend(files)
+    sql += " ORDER BY bm25(lines) LIMIT ?"
+    params.append(limit)
+
+    conn = _connect()
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    except sqlite3.OperationalError as exc:
+        raise RuntimeError(f"Bad search query: {exc}") from exc
+    finally:
+        conn.close()
+    return [Hit(*row) for row in rows]
@@ -0,0 +1,380 @@
+"""Local HTTP job server: many editors, one warm process.
+
+Endpoints (JSON in, JSON out):
+
+    POST /jobs          {"original": ..., "feedback": "", "priority": "interactive"|"background",
+                         "fast": false, "speculative": false}  -> 202 {"id": ..., "status": "queued"}
+                        {"task": "reapply", "session": <archived session name>, "fast": false}
+                        {"task": "rebuild", "workers": 4, "fan_in": 4, "fresh": false}
+    GET  /jobs          -> {"jobs": [<job summary>, ...]}
+    GET  /jobs/<id>     -> <job>, including "result" once done
+    GET  /health        -> {"status": "ok", "queued": n, "running": n}
+    GET  /metrics       -> {"jobs": {<status>: n}, "scheduler": <Scheduler.metrics()>}
+
+`edit`, `reapply` and `preferences rebuild` submit their work here when
+given --server (or EDITOR_SERVER), so authors' chapters and backlist work
+share one scheduler. Reapply and rebuild jobs always run in the background.
+
+A failed preference update doesn't fail the job: the edit is still archived
+and the error is reported in the job's "warning". Once a job is archived its
+chapter texts are dropped from memory (the result keeps the edited texts),
+and only the newest finished jobs are kept.
+
+Jobs are queued by priority (interactive before background, then FIFO) and
+run by a pool of worker threads, by default twice the scheduler's
+EDITOR_MAX_CONCURRENT. Background jobs may fill at most EDITOR_MAX_CONCURRENT
+workers, and never all of them, so an interactive job always finds a free
+worker; its Claude calls then go ahead of queued bulk calls in the
+scheduler (see scheduler.py). Each edit job runs the same pipeline as
+`cli edit` — analyzer, profile and archive — but on in-memory texts, so
+concurrent jobs never share the repo-root working files.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import json
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass, field
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from editor.analyzer import (
+    compact_preferences,
+    edit_ai_only,
+    edit_with_feedback,
+    needs_compaction,
+    start_call_log,
+    update_preferences,
+)
+from editor.archive import archive_texts, find_session, snapshot_preferences
+from editor.index import book_summary, update_index
+from editor.profile import backup_preferences, load_preferences, save_preferences
+from editor.reapply import reedit_session
+from editor.rebuild import rebuild_preferences
+from editor.scheduler import get_scheduler, priority
+from editor.search import update_search_index
+
+PRIORITIES = {"interactive": 0, "background": 1}
+# Task -> the request fields it takes besides the common ones
+TASK_OPTIONS = {"edit": (), "reapply": ("session",), "rebuild": ("workers", "fan_in", "fresh")}
+MAX_BODY_BYTES = 10 * 1024 * 1024
+# Finished jobs kept for polling; older ones are forgotten (their archives remain)
+MAX_FINISHED_JOBS = 200
+
+
+@dataclass
+class Job:
+    """One submitted chapter (or reapply / rebuild task) and its progress."""
+
+    id: str
+    original: str
+    feedback: str = ""
+    priority: str = "interactive"
+    fast: bool = False
+    speculative: bool = False
+    mode: str = "ai"  # "human" when feedback was given
+    task: str = "edit"
+    options: dict = field(default_factory=dict)
+    status: str = "queued"  # queued, running, done, failed
+    submitted_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    result: dict | None = None
+    error: str | None = None
+    warning: str | None = None
+
+    def summary(self) -> dict:
+        """Job status without the (large) chapter texts."""
+        data = asdict(self)
+        for key in ("original", "feedback", "result"):
+            data.pop(key)
+        return data
+
+
+def _check_options(task: str, options: dict) -> None:
+    """Raise ValueError for a reapply/rebuild option the task can't run with."""
+    if task == "reapply":
+        name = options.get("session")
+        folder = find_session(name) if isinstance(name, str) else None
+        if folder is None or not (folder / "final.md").exists():
+            raise ValueError(f"no archived session {name!r} with a final.md")
+    for key in ("workers", "fan_in"):
+        value = options.get(key, 1)
+        if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+            raise ValueError(f"'{key}' must be a positive integer")
+    if not isinstance(options.get("fresh", False), bool):
+        raise ValueError("'fresh' must be true or false")
+
+
+class JobQueue:
+    """Priority queue of jobs drained by a capped pool of worker threads."""
+
+    def __init__(self, workers: int | None = None, max_finished: int = MAX_FINISHED_JOBS):
+        max_concurrent = get_scheduler().max_concurrent
+        workers = 2 * max_concurrent if workers is None else workers
+        if workers < 1:
+            raise ValueError("workers must be at least 1")  # no worker would ever run a job
+        self.workers = workers
+        # Leave at least one worker for interactive jobs; more background jobs
+        # than the scheduler admits at once would only wait in it
+        self.max_background = max(1, min(max_concurrent, workers - 1))
+        self.max_finished = max_finished
+        self._jobs: dict[str, Job] = {}  # insertion (= submission) order
+        self._pending: list[tuple[int, int, str]] = []  # heap of (priority, seq, job id)
+        self._background_running = 0
+        self._stopping = False
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        # Preference updates read-modify-write authorpreferences.md
+        self._preferences_lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        self._stopping = False
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"editor-worker-{n + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        """Stop the workers once their current jobs finish; queued jobs stay queued."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads.clear()
+
+    def submit(self, original: str = "", feedback: str = "", priority: str = "interactive",
+               fast: bool = False, speculative: bool = False, task: str = "edit",
+               options: dict | None = None) -> Job:
+        if task not in TASK_OPTIONS:
+            raise ValueError(f"task must be one of {sorted(TASK_OPTIONS)}")
+        if priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of {sorted(PRIORITIES)}")
+        if fast and speculative:
+            raise ValueError("'fast' and 'speculative' can't be combined")
+        options = options or {}
+        _check_options(task, options)
+        if task != "edit":
+            priority = "background"  # backlist work never goes ahead of an author
+        job = Job(uuid.uuid4().hex[:12], original, feedback, priority, fast, speculative,
+                  mode="human" if feedback else "ai", task=task, options=options)
+        with self._cond:
+            self._jobs[job.id] = job
+            heapq.heappush(self._pending, (PRIORITIES[priority], next(self._seq), job.id))
+            self._cond.notify_all()
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> list[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def counts(self) -> dict[str, int]:
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        for job in self.jobs():
+            counts[job.status] += 1
+        return counts
+
+    def _next_job(self) -> Job | None:
+        """Block until a job may start (None once stopping) and claim it."""
+        with self._cond:
+            while not self._stopping:
+                if self._pending:
+                    prio, _, job_id = self._pending[0]
+                    if prio == PRIORITIES["interactive"] or self._background_running < self.max_background:
+                        heapq.heappop(self._pending)
+                        if prio != PRIORITIES["interactive"]:
+                            self._background_running += 1
+                        job = self._jobs[job_id]
+                        job.status, job.started_at = "running", time.time()
+                        return job
+                self._cond.wait()
+            return None
+
+    def _worker(self) -> None:
+        while (job := self._next_job()) is not None:
+            try:
+                with priority("bulk") if job.priority == "background" else nullcontext():
+                    job.result = self._run(job)
+                job.status = "done"
+            except Exception as exc:  # report any failure on the job, keep the worker alive
+                job.error = f"{type(exc).__name__}: {exc}"
+                job.status = "failed"
+            # The chapter is archived (or the job failed); don't hold its texts
+            job.original = job.feedback = ""
+            job.finished_at = time.time()
+            with self._cond:
+                if job.priority == "background":
+                    self._background_running -= 1
+                self._cond.notify_all()
+            self._evict_finished()
+
+    def _evict_finished(self) -> None:
+        with self._lock:
+            finished = [j.id for j in self._jobs.values() if j.status in ("done", "failed")]
+            for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+                del self._jobs[job_id]
+
+    def _update_preferences(self, job: Job, final: str) -> str | None:
+        """Learn from a feedback job's edit and return the saved preferences.
+
+        Caller holds the preferences lock. None if nothing was learned.
+        """
+        # Re-read: another job may have updated preferences meanwhile
+        new_prefs = update_preferences(job.original, job.feedback, final, load_preferences())
+        if not new_prefs:
+            return None
+        save_preferences(new_prefs)
+        if needs_compaction(new_prefs):
+            compacted = compact_preferences(new_prefs)
+            if compacted != new_prefs:
+                backup_preferences()
+                save_preferences(compacted)
+                return compacted
+        return new_prefs
+
+    def _run(self, job: Job) -> dict:
+        """Run one job: an edit session on in-memory texts, a reapply or a rebuild."""
+        if job.task == "reapply":
+            folder = reedit_session(job.options["session"], load_preferences(), fast=job.fast)
+            return {"archive": str(folder)}
+        if job.task == "rebuild":
+            return {"preferences": rebuild_preferences(**job.options)}
+
+        calls = start_call_log()
+        preferences = load_preferences()
+        book_context = book_summary(job.original, preferences)
+        meta = {"calls": calls, "job": job.id}
+
+        if job.feedback:
+            reasoning, final = edit_with_feedback(
+                job.original, job.feedback, preferences, book_context=book_context, fast=job.fast
+            )
+            with self._preferences_lock:
+                try:
+                    learned = self._update_preferences(job, final)
+                    if learned:  # final.md already follows the rules it just taught
+                        meta["rules_checked_version"] = snapshot_preferences(learned)
+                except Exception as exc:  # best effort: report it, still archive the edit
+                    job.warning = f"preference update failed: {type(exc).__name__}: {exc}"
+            texts = {"original.md": job.original, "edited.md": job.feedback,
+                     "aiedited.md": reasoning, "final.md": final}
+            mode = "human"
+        else:
+            reasoning, final = edit_ai_only(
+                job.original, preferences, speculative=job.speculative,
+                book_context=book_context, fast=job.fast,
+            )
+            texts = {"original.md": job.original, "final.md": final}
+            mode = "ai"
+
+        folder = archive_texts(mode, texts, meta=meta, preferences=preferences)
+        update_index(folder)
+        update_search_index(folder)
+        return {"reasoning": reasoning, "final": final, "archive": str(folder), "calls": calls}
+
+
+def make_handler(jobs: JobQueue) -> type[BaseHTTPRequestHandler]:
+    """Build a request handler class bound to a JobQueue."""
+
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "StyleEditor/0.2"
+
+        def do_GET(self) -> None:
+            path = self.path.rstrip("/")
+            if path == "/health":
+                counts = jobs.counts()
+                self._send(HTTPStatus.OK, {"status": "ok", "queued": counts["queued"],
+                                           "running": counts["running"]})
+            elif path == "/metrics":
+                self._send(HTTPStatus.OK, {"jobs": jobs.counts(), "scheduler": get_scheduler().metrics()})
+            elif path == "/jobs":
+                self._send(HTTPStatus.OK, {"jobs": [j.summary() for j in jobs.jobs()]})
+            elif path.startswith("/jobs/"):
+                job = jobs.get(path[len("/jobs/"):])
+                if job is None:
+                    self._send(HTTPStatus.NOT_FOUND, {"error": "no such job"})
+                else:
+                    self._send(HTTPStatus.OK, {**job.summary(), "result": job.result})
+            else:
+                self._send(HTTPStatus.NOT_FOUND, {"error": "not found"})
+
+        def do_POST(self) -> None:
+            if self.path.rstrip("/") != "/jobs":
+                self._send(HTTPStatus.NOT_FOUND, {"error": "not found"})
+                return
+
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                self._send(HTTPStatus.BAD_REQUEST, {"error": "bad Content-Length"})
+                return
+            if length > MAX_BODY_BYTES:
+                self._send(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "body too large"})
+                return
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:  # bad JSON or bad UTF-8
+                self._send(HTTPStatus.BAD_REQUEST, {"error": "body must be JSON"})
+                return
+            if not isinstance(body, dict):
+                self._send(HTTPStatus.BAD_REQUEST, {"error": "body must be a JSON object"})
+                return
+
+            for key in ("original", "feedback", "priority", "task"):
+                if body.get(key) is not None and not isinstance(body[key], str):
+                    self._send(HTTPStatus.BAD_REQUEST, {"error": f"'{key}' must be a string"})
+                    return
+            task = body.get("task") or "edit"
+            original = (body.get("original") or "").strip()
+            if task == "edit" and not original:
+                self._send(HTTPStatus.BAD_REQUEST, {"error": "'original' is required"})
+                return
+            try:
+                job = jobs.submit(
+                    original,
+                    feedback=(body.get("feedback") or "").strip(),
+                    priority=body.get("priority") or "interactive",
+                    fast=bool(body.get("fast")),
+                    speculative=bool(body.get("speculative")),
+                    task=task,
+                    options={key: body[key] for key in TASK_OPTIONS.get(task, ()) if key in body},
+                )
+            except ValueError as exc:
+                self._send(HTTPStatus.BAD_REQUEST, {"error": str(exc)})
+                return
+            self._send(HTTPStatus.ACCEPTED, {"id": job.id, "status": job.status})
+
+        def log_message(self, format: str, *args) -> None:  # quiet by default
+            pass
+
+        def _send(self, status: HTTPStatus, payload: dict) -> None:
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return Handler
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8765,
+                workers: int | None = None) -> tuple[ThreadingHTTPServer, JobQueue]:
+    """Create (but don't start serving) the HTTP server and its job queue."""
+    jobs = JobQueue(workers=workers)
+    httpd = ThreadingHTTPServer((host, port), make_handler(jobs))
+    return httpd, jobs
@@ -0,0 +1,49 @@
+"""Plain-text helpers shared by the editing passes."""
+
+from __future__ import annotations
+
+import re
+
+_PARAGRAPH_BREAK_RE = re.compile(r"\n[ \t]*\n+")
+
+
+def split_paragraphs(text: str) -> list[str]:
+    """Split text on blank lines into non-empty paragraphs."""
+    return [p.strip() for p in _PARAGRAPH_BREAK_RE.split(text.strip()) if p.strip()]
+
+
+def join_paragraphs(paragraphs: list[str]) -> str:
+    """Join paragraphs back together with a single blank line between them."""
+    return "\n\n".join(paragraphs)
+
+
+_WORD_RE = re.compile(r"[A-Za-z][A-Za-z'’-]*[A-Za-z]|[A-Za-z]")
+
+
+def words(text: str) -> list[str]:
+    """Split text into words (letters, inner apostrophes and hyphens)."""
+    return _WORD_RE.findall(text)
+
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?…])[\"'”’)\]]*\s+")
+
+
+def split_sentences(paragraph: str) -> list[str]:
+    """Split a paragraph into sentences, keeping closing quotes with their sentence."""
+    sentences = []
+    start = 0
+    for match in _SENTENCE_END_RE.finditer(paragraph):
+        end = match.end()
+        sentence = paragraph[start:end].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = end
+    tail = paragraph[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return sentences
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English prose (~4 characters per token)."""
+    return (len(text) + 3) // 4
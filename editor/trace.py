@@ -0,0 +1,117 @@
+"""Opt-in timing spans for the edit pipeline, saved as Chrome trace-event JSON.
+
+Enable with `edit --profile` (or EDITOR_TRACE=1). Spans are recorded with
+`with span("name", key=value): ...` anywhere in the pipeline; when no trace
+is active a span costs one global lookup. The result is written to
+trace.json in the session's archive folder — open it in chrome://tracing or
+https://ui.perfetto.dev. `--cprofile` (or EDITOR_TRACE=cprofile) also saves
+a cProfile dump as profile.pstats.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+TRACE_NAME = "trace.json"
+PSTATS_NAME = "profile.pstats"
+
+
+class Tracer:
+    """Collects complete ('X') trace events from any thread."""
+
+    def __init__(self, cprofile: bool = False) -> None:
+        self.events: list[dict] = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+        self.profiler = cProfile.Profile() if cprofile else None
+
+    def now_us(self) -> float:
+        return (time.perf_counter() - self._origin) * 1_000_000
+
+    def add(self, name: str, start_us: float, end_us: float, args: dict) -> None:
+        event = {
+            "name": name,
+            "cat": "editor",
+            "ph": "X",
+            "ts": round(start_us, 1),
+            "dur": round(end_us - start_us, 1),
+            "pid": self._pid,
+            "tid": threading.get_ident(),
+            "args": args,
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def save(self, folder: Path) -> list[Path]:
+        """Write trace.json (and profile.pstats if captured) into folder."""
+        folder.mkdir(parents=True, exist_ok=True)
+        trace_path = folder / TRACE_NAME
+        with self._lock:
+            events = sorted(self.events, key=lambda e: e["ts"])
+        trace_path.write_text(
+            json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}, indent=1), encoding="utf-8"
+        )
+        paths = [trace_path]
+        if self.profiler:
+            pstats_path = folder / PSTATS_NAME
+            self.profiler.dump_stats(str(pstats_path))
+            paths.append(pstats_path)
+        return paths
+
+
+_active: Tracer | None = None
+
+
+def env_mode() -> str:
+    """Trace mode requested via EDITOR_TRACE: '', 'trace' or 'cprofile'."""
+    value = os.getenv("EDITOR_TRACE", "").strip().lower()
+    if value in ("", "0", "false", "no", "off"):
+        return ""
+    return "cprofile" if value == "cprofile" else "trace"
+
+
+def start_trace(cprofile: bool = False) -> Tracer:
+    """Start collecting spans (and optionally cProfile data) process-wide."""
+    global _active
+    _active = Tracer(cprofile=cprofile)
+    if _active.profiler:
+        _active.profiler.enable()
+    return _active
+
+
+def stop_trace() -> Tracer | None:
+    """Stop collecting and return the finished tracer."""
+    global _active
+    tracer, _active = _active, None
+    if tracer and tracer.profiler:
+        tracer.profiler.disable()
+    return tracer
+
+
+@contextmanager
+def span(name: str, **args) -> Iterator[dict]:
+    """Time a block as a trace span. Yields a dict for adding args mid-span."""
+    tracer = _active
+    if tracer is None:
+        yield args
+        return
+    start = tracer.now_us()
+    try:
+        yield args
+    finally:
+        tracer.add(name, start, tracer.now_us(), args)
+
+
+def mark(args: dict, key: str) -> None:
+    """Record the current offset (ms) within the active trace under args[key]."""
+    tracer = _active
+    if tracer is not None and key not in args:
+        args[key] = round(tracer.now_us() / 1000, 2)
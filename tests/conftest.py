@@ -0,0 +1,46 @@
+"""Shared fixtures: a throwaway history/ folder and archived sessions in it."""
+
+from __future__ import annotations
+
+from contextlib import ExitStack
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from editor import archive
+
+# Every module that reads history/ through its own HISTORY_DIR import
+HISTORY_MODULES = ("archive", "index", "rebuild", "search")
+
+
+@pytest.fixture
+def history(tmp_path: Path):
+    h = tmp_path / "history"
+    h.mkdir()
+    with ExitStack() as stack:
+        for name in HISTORY_MODULES:
+            stack.enter_context(patch(f"editor.{name}.HISTORY_DIR", h))
+        yield h
+
+
+@pytest.fixture
+def make_session(history: Path):
+    """Create an archived session: make_session(name, final=..., preferences=...).
+
+    Keyword arguments other than preferences are file stems ('final' ->
+    final.md); empty texts are skipped. If preferences is given, its snapshot
+    version is recorded in session.json.
+    """
+
+    def make(name: str, preferences: str | None = None, **files: str) -> Path:
+        folder = history / name
+        folder.mkdir()
+        for stem, text in files.items():
+            if text:
+                (folder / f"{stem}.md").write_text(text, encoding="utf-8")
+        if preferences is not None:
+            archive.write_session_meta(folder, {"preferences_version": archive.snapshot_preferences(preferences)})
+        return folder
+
+    return make
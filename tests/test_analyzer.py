@@ -8,11 +8,17 @@ from unittest.mock import MagicMock, patch
 import pytest
 
 from editor.analyzer import (
-    _split_output,
+    _call_claude,
+    _record_call,
+    compact_preferences,
     edit_ai_only,
     edit_with_feedback,
+    needs_compaction,
+    start_call_log,
     update_preferences,
 )
+from editor.parser import parse_output
+from editor.routing import FAST_MODEL, STRONG_MODEL, escalation_for, max_tokens_for, model_for
 
 
 SAMPLE_RESPONSE = """\
@@ -27,25 +33,24 @@ Tired didn't cover it.\
 """
 
 
-class TestSplitOutput:
+class TestParseResponse:
     def test_splits_on_delimiter(self):
-        reasoning, final = _split_output(SAMPLE_RESPONSE)
-        assert "Reasoning" in reasoning
-        assert "Tired didn't cover it." in final
-        assert "===FINAL===" not in reasoning
-        assert "===FINAL===" not in final
+        parsed = parse_output(SAMPLE_RESPONSE)
+        assert "Reasoning" in parsed.reasoning
+        assert "Tired didn't cover it." in parsed.final
+        assert "===FINAL===" not in parsed.reasoning
+        assert "===FINAL===" not in parsed.final
 
     def test_no_delimiter_returns_full_as_final(self):
-        raw = "Just a chapter with no delimiter."
-        reasoning, final = _split_output(raw)
-        assert "No reasoning" in reasoning
-        assert final == "Just a chapter with no delimiter."
+        parsed = parse_output("Just a chapter with no delimiter.")
+        assert not parsed.delimiter_found
+        assert parsed.reasoning == ""
+        assert parsed.final == "Just a chapter with no delimiter."
 
     def test_strips_whitespace(self):
-        raw = "  reasoning  \n\n===FINAL===\n\n  chapter  \n"
-        reasoning, final = _split_output(raw)
-        assert reasoning == "reasoning"
-        assert final == "chapter"
+        parsed = parse_output("  reasoning  \n\n===FINAL===\n\n  chapter  \n")
+        assert parsed.reasoning == "reasoning"
+        assert parsed.final == "chapter"
 
 
 class TestEditWithFeedback:
@@ -104,3 +109,237 @@ class TestUpdatePreferences:
         )
         assert "Author Preferences" in result
         mock_call.assert_called_once()
+
+
+class TestReask:
+    @patch("editor.analyzer._call_claude")
+    def test_missing_final_reasks_only_chapter(self, mock_call):
+        mock_call.side_effect = [
+            "OUTPUT 1 — REASONING\nBefore: He was tired.\nAfter: Tired.",
+            "Tired.",
+        ]
+
+        reasoning, final = edit_ai_only("He was tired.", "Be concise.")
+        assert "Before:" in reasoning
+        assert final == "Tired."
+        assert mock_call.call_count == 2
+        reask_content = mock_call.call_args_list[1][0][1]
+        assert "CHANGES:" in reask_content
+        assert "Before: He was tired." in reask_content
+
+    @patch("editor.analyzer._call_claude")
+    def test_missing_reasoning_reasks_only_change_log(self, mock_call):
+        mock_call.side_effect = ["Tired.", "Changed 'He was tired.' to 'Tired.'"]
+
+        reasoning, final = edit_ai_only("He was tired.", "Be concise.")
+        assert final == "Tired."
+        assert "Changed" in reasoning
+        assert "FINAL:\nTired." in mock_call.call_args_list[1][0][1]
+
+    @patch("editor.analyzer._call_claude")
+    def test_keeps_first_chapter_if_reask_is_worse(self, mock_call, monkeypatch):
+        monkeypatch.setenv("EDITOR_ESCALATE", "0")
+        original = "word " * 400
+        mock_call.side_effect = ["reasons\n===FINAL===\n" + "word " * 200, ""]
+
+        reasoning, final = edit_ai_only(original, "")
+        assert final == ("word " * 200).strip()
+
+
+class TestRouting:
+    @patch("editor.analyzer._call_claude")
+    def test_routes_by_task(self, mock_call):
+        mock_call.return_value = "reason\n===FINAL===\nchapter"
+
+        edit_ai_only("text", "prefs")
+        edit_with_feedback("text", "feedback", "prefs")
+        update_preferences("text", "feedback", "chapter", "prefs")
+        models = [c[1].get("model") or model_for(c[1]["task"]) for c in mock_call.call_args_list]
+        assert models == [STRONG_MODEL, STRONG_MODEL, FAST_MODEL]
+
+    @patch("editor.analyzer._call_claude")
+    def test_escalates_invalid_chapter_to_strong_model(self, mock_call, monkeypatch):
+        monkeypatch.setenv("EDITOR_MODEL_EDIT_AI_ONLY", "fast")
+        original = "word " * 400
+        mock_call.side_effect = [
+            "reasons\n===FINAL===\n" + "word " * 100,
+            "reasons\n===FINAL===\n" + "word " * 390,
+        ]
+
+        reasoning, final = edit_ai_only(original, "prefs")
+        assert final == ("word " * 390).strip()
+        models = [c[1]["model"] for c in mock_call.call_args_list]
+        assert models == [FAST_MODEL, STRONG_MODEL]
+
+    @patch("editor.analyzer._call_claude")
+    def test_call_log_records_models(self, mock_call):
+        mock_call.side_effect = lambda *a, **kw: (_record_call(kw["task"], kw["model"]) or
+                                                  "reason\n===FINAL===\nchapter")
+
+        calls = start_call_log()
+        edit_ai_only("text", "prefs")
+        assert calls == [{"task": "edit_ai_only", "model": STRONG_MODEL}]
+
+    @patch("editor.analyzer._get_client")
+    def test_max_tokens_clamped_to_model_limit(self, mock_client):
+        response = MagicMock()
+        response.content = [MagicMock(text="ok")]
+        create = mock_client.return_value.messages.create
+        create.return_value = response
+
+        _call_claude("sys", "user", model=FAST_MODEL)
+        _call_claude("sys", "user", model=STRONG_MODEL)
+        _call_claude("sys", "user", max_tokens=1024, model=FAST_MODEL)
+        assert [c[1]["max_tokens"] for c in create.call_args_list] == [8192, 16384, 1024]
+
+
+class TestModelFor:
+    def test_env_tier_override(self, monkeypatch):
+        monkeypatch.setenv("EDITOR_MODEL_EDIT_AI_ONLY", "fast")
+        assert model_for("edit_ai_only") == FAST_MODEL
+
+    def test_chapter_edits_default_to_strong(self):
+        assert model_for("edit_ai_only") == STRONG_MODEL
+        assert model_for("scan") == FAST_MODEL
+
+    def test_max_tokens_for(self):
+        assert max_tokens_for(FAST_MODEL, 16384) == 8192
+        assert max_tokens_for(STRONG_MODEL, 16384) == 16384
+        assert max_tokens_for("some-other-model", 16384) == 16384
+
+    def test_env_model_id_override(self, monkeypatch):
+        monkeypatch.setenv("EDITOR_MODEL_PREFERENCES", "claude-custom")
+        assert model_for("preferences") == "claude-custom"
+
+    def test_unknown_task_uses_strong(self):
+        assert model_for("something_else") == STRONG_MODEL
+
+    def test_no_escalation_past_strong(self):
+        assert escalation_for(STRONG_MODEL) is None
+        assert escalation_for(FAST_MODEL) == STRONG_MODEL
+
+    def test_escalation_disabled(self, monkeypatch):
+        monkeypatch.setenv("EDITOR_ESCALATE", "0")
+        assert escalation_for(FAST_MODEL) is None
+
+
+class TestSpeculative:
+    ORIGINAL = "Para one.\n\nKenji's gamer instincts kicked in.\n\nPara three."
+
+    @patch("editor.analyzer._call_claude")
+    def test_rewrites_only_flagged_paragraphs(self, mock_call):
+        mock_call.side_effect = [
+            "2",
+            "Replaced 'gamer'.\n===FINAL===\n[P2]\nKenji's tactical instincts kicked in.",
+        ]
+
+        reasoning, final = edit_ai_only(self.ORIGINAL, "Never say gamer.", speculative=True)
+        assert final == "Para one.\n\nKenji's tactical instincts kicked in.\n\nPara three."
+        assert "flagged 1 of 3" in reasoning
+        assert "Replaced 'gamer'." in reasoning
+        rewrite_content = mock_call.call_args_list[1][0][1]
+        assert "[P2]" in rewrite_content
+        assert "Para one." not in rewrite_content
+        assert [c[1]["task"] for c in mock_call.call_args_list] == ["scan", "rewrite"]
+
+    @patch("editor.analyzer._call_claude")
+    def test_nothing_flagged_skips_rewrite(self, mock_call):
+        mock_call.return_value = "NONE"
+
+        reasoning, final = edit_ai_only(self.ORIGINAL, "Never say gamer.", speculative=True)
+        assert final == self.ORIGINAL
+        assert "no changes needed" in reasoning
+        mock_call.assert_called_once()
+
+    @patch("editor.analyzer._call_claude")
+    def test_out_of_range_and_missing_blocks_keep_original(self, mock_call):
+        mock_call.side_effect = ["2, 3, 99", "reasons\n===FINAL===\n[P3]\nPara three, edited."]
+
+        reasoning, final = edit_ai_only(self.ORIGINAL, "prefs", speculative=True)
+        assert final == "Para one.\n\nKenji's gamer instincts kicked in.\n\nPara three, edited."
+
+    @patch("editor.analyzer._call_claude")
+    def test_scan_accepts_tagged_numbers(self, mock_call):
+        mock_call.side_effect = ["[P2], p3.", "reasons\n===FINAL===\n[P2]\nTwo.\n\n[P3]\nThree."]
+
+        reasoning, final = edit_ai_only(self.ORIGINAL, "prefs", speculative=True)
+        assert final == "Para one.\n\nTwo.\n\nThree."
+
+    @patch("editor.analyzer._call_claude")
+    def test_chatty_scan_falls_back_to_full_edit(self, mock_call):
+        mock_call.side_effect = ["P3 (uses 'lattice' 2 times)", "reason\n===FINAL===\nchapter"]
+
+        reasoning, final = edit_ai_only(self.ORIGINAL, "prefs", speculative=True)
+        assert final == "chapter"
+        assert [c[1]["task"] for c in mock_call.call_args_list] == ["scan", "edit_ai_only"]
+
+    @patch("editor.analyzer._call_claude")
+    def test_no_preferences_falls_back_to_full_edit(self, mock_call):
+        mock_call.return_value = "reason\n===FINAL===\nchapter"
+
+        reasoning, final = edit_ai_only(self.ORIGINAL, "", speculative=True)
+        assert final == "chapter"
+        assert mock_call.call_args[1]["task"] == "edit_ai_only"
+
+
+class TestBookContext:
+    @patch("editor.analyzer._call_claude")
+    def test_book_context_added_to_prompt(self, mock_call):
+        mock_call.return_value = "reason\n===FINAL===\nchapter"
+
+        edit_with_feedback("text", "feedback", "prefs", book_context="lattice: 40 uses")
+        assert "BOOK CONTEXT:\nlattice: 40 uses" in mock_call.call_args[0][1]
+
+    @patch("editor.analyzer._call_claude")
+    def test_no_book_context_section_when_empty(self, mock_call):
+        mock_call.return_value = "reason\n===FINAL===\nchapter"
+
+        edit_ai_only("text", "prefs")
+        assert "BOOK CONTEXT" not in mock_call.call_args[0][1]
+
+
+class TestFastMode:
+    @patch("editor.analyzer._call_claude")
+    def test_chapter_only_with_local_change_log(self, mock_call):
+        mock_call.return_value = "Kenji's tactical instincts kicked in."
+
+        reasoning, final = edit_ai_only(
+            "Kenji's gamer instincts kicked in.", 'NEVER use "gamer".', fast=True
+        )
+        assert final == "Kenji's tactical instincts kicked in."
+        assert 'preference: "gamer"' in reasoning
+        mock_call.assert_called_once()
+        assert "Output ONLY the clean, edited chapter" in mock_call.call_args[0][0]
+
+    @patch("editor.analyzer._call_claude")
+    def test_strips_reasoning_preamble_if_model_adds_one(self, mock_call):
+        mock_call.return_value = "Some notes.\n===FINAL===\nEdited."
+
+        reasoning, final = edit_with_feedback("Original.", "[fix]", "", fast=True)
+        assert final == "Edited."
+        assert "Some notes" not in reasoning
+
+
+class TestCompaction:
+    @patch("editor.analyzer._call_claude")
+    def test_returns_shorter_document(self, mock_call):
+        mock_call.return_value = "# Prefs\n- Avoid gamer."
+        prefs = "# Prefs\n- Avoid gamer.\n- Avoid gamer (seen again).\n## Structural Changes (Noted but not implemented)\n- x"
+
+        assert compact_preferences(prefs) == "# Prefs\n- Avoid gamer."
+        assert "Structural Changes" in mock_call.call_args[0][1]
+        assert mock_call.call_args[1]["task"] == "compaction"
+
+    @patch("editor.analyzer._call_claude")
+    def test_keeps_original_if_not_shorter(self, mock_call):
+        mock_call.return_value = "A much longer rewrite of the preferences."
+        assert compact_preferences("Short prefs.") == "Short prefs."
+
+    @patch("editor.analyzer._call_claude")
+    def test_keeps_original_if_empty(self, mock_call):
+        mock_call.return_value = "  "
+        assert compact_preferences("Prefs.") == "Prefs."
+
+    def test_needs_compaction_threshold(self):
+        assert not needs_compaction("x" * 100)
+        assert needs_compaction("x" * 100_000)
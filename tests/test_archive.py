@@ -114,3 +114,31 @@ class TestListHistory:
         sessions = archive.list_history()
         assert "original.md" in sessions[0]["files"]
         assert "final.md" in sessions[0]["files"]
+
+
+class TestSessionMeta:
+    def test_meta_written_to_session_json(self, tmp_workspace):
+        folder = archive.archive_ai_only(meta={"calls": [{"task": "edit_ai_only", "model": "m"}]})
+        assert archive.read_session_meta(folder)["calls"][0]["model"] == "m"
+
+    def test_no_meta_no_file(self, tmp_workspace):
+        folder = archive.archive_human_feedback()
+        assert not (folder / "session.json").exists()
+
+    def test_write_merges(self, tmp_workspace):
+        folder = archive.archive_ai_only(meta={"a": 1})
+        archive.write_session_meta(folder, {"b": 2})
+        assert archive.read_session_meta(folder) == {"a": 1, "b": 2}
+
+
+class TestArchiveTexts:
+    def test_writes_texts_without_touching_working_files(self, tmp_workspace):
+        folder = archive.archive_texts("ai", {"original.md": "Orig.", "final.md": "Fin.", "aiedited.md": ""})
+        assert folder.name.endswith("_ai")
+        assert sorted(f.name for f in folder.iterdir()) == ["final.md", "original.md"]
+        assert tmp_workspace["ORIGINAL_PATH"].read_text(encoding="utf-8") == "Original chapter."
+
+    def test_same_second_sessions_get_unique_folders(self, tmp_workspace):
+        folders = {archive.archive_texts("human", {"final.md": "x"}) for _ in range(3)}
+        assert len(folders) == 3
+        assert all(f.name.endswith("_human") for f in folders)
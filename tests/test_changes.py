@@ -0,0 +1,46 @@
+"""Tests for the locally computed change log."""
+
+from __future__ import annotations
+
+from editor.changes import build_change_log, diff_changes
+
+
+ORIGINAL = "# Chapter 1\n\nKenji ran. The lattice glowed. He stopped.\n\nLyra waited.\n\nEnd."
+PREFS = '**Avoid overusing "lattice"** - vary it.'
+
+
+class TestDiffChanges:
+    def test_identical_texts(self):
+        assert diff_changes(ORIGINAL, ORIGINAL) == []
+
+    def test_sentence_level_change(self):
+        final = ORIGINAL.replace("The lattice glowed.", "The pale veins glowed.")
+        changes = diff_changes(ORIGINAL, final)
+        assert len(changes) == 1
+        assert changes[0].kind == "changed"
+        assert changes[0].paragraph == 2
+        assert changes[0].before == "The lattice glowed."
+        assert changes[0].after == "The pale veins glowed."
+
+    def test_removed_and_added_paragraphs(self):
+        final = "# Chapter 1\n\nKenji ran. The lattice glowed. He stopped.\n\nEnd.\n\nEpilogue."
+        kinds = [(c.kind, c.before or c.after) for c in diff_changes(ORIGINAL, final)]
+        assert kinds == [("removed", "Lyra waited."), ("added", "Epilogue.")]
+
+
+class TestBuildChangeLog:
+    def test_annotates_matching_preference(self):
+        final = ORIGINAL.replace("The lattice glowed.", "The pale veins glowed.")
+        log = build_change_log(ORIGINAL, final, PREFS)
+        assert "1 change(s)." in log
+        assert 'Paragraph 2 — changed [preference: "lattice"]' in log
+        assert "Before: The lattice glowed." in log
+        assert "After: The pale veins glowed." in log
+
+    def test_unrelated_change_not_annotated(self):
+        final = ORIGINAL.replace("Lyra waited.", "Lyra crouched.")
+        log = build_change_log(ORIGINAL, final, PREFS)
+        assert "preference:" not in log
+
+    def test_no_changes(self):
+        assert "No changes" in build_change_log(ORIGINAL, ORIGINAL, PREFS)
@@ -2,13 +2,16 @@
 
 from __future__ import annotations
 
+import json
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import pytest
+from anthropic import AnthropicError
 from click.testing import CliRunner
 
 from editor.cli import cli
+from editor.search import Hit
 
 
 @pytest.fixture
@@ -47,6 +50,32 @@ class TestEditCommand:
         mock_edit.assert_called_once()
         mock_archive.assert_called_once()
 
+    @patch("editor.cli.archive_ai_only")
+    @patch("editor.cli.save_final")
+    @patch("editor.cli.save_reasoning")
+    @patch("editor.cli.edit_ai_only")
+    @patch("editor.cli.load_preferences")
+    @patch("editor.cli.load_feedback")
+    @patch("editor.cli.load_original")
+    def test_speculative_flag(
+        self, mock_orig, mock_fb, mock_prefs, mock_edit, mock_save_r, mock_save_f, mock_archive, runner
+    ):
+        mock_orig.return_value = "Chapter text."
+        mock_fb.return_value = ""
+        mock_prefs.return_value = "Be concise."
+        mock_edit.return_value = ("AI reasoning.", "Edited chapter.")
+        mock_archive.return_value = Path("/tmp/history/2026-01-01_ai")
+
+        result = runner.invoke(cli, ["edit", "--speculative"])
+        assert result.exit_code == 0
+        assert mock_edit.call_args[1]["speculative"] is True
+
+    def test_speculative_and_fast_rejected(self, runner):
+        result = runner.invoke(cli, ["edit", "--speculative", "--fast"])
+        assert result.exit_code == 2
+        assert "can't be combined" in result.output
+
+    @patch("editor.cli.snapshot_preferences", return_value="v2")
     @patch("editor.cli.archive_human_feedback")
     @patch("editor.cli.save_preferences")
     @patch("editor.cli.update_preferences")
@@ -59,7 +88,7 @@ class TestEditCommand:
     def test_human_feedback_mode(
         self,
         mock_orig, mock_fb, mock_prefs, mock_edit, mock_save_r, mock_save_f,
-        mock_update_prefs, mock_save_prefs, mock_archive, runner
+        mock_update_prefs, mock_save_prefs, mock_archive, mock_snapshot, runner
     ):
         mock_orig.return_value = "Chapter text."
         mock_fb.return_value = "[too wordy]"
@@ -75,7 +104,31 @@ class TestEditCommand:
         mock_edit.assert_called_once()
         mock_update_prefs.assert_called_once()
         mock_save_prefs.assert_called_once()
-        mock_archive.assert_called_once()
+        # The session already follows the rules it just taught
+        assert mock_archive.call_args[1]["meta"]["rules_checked_version"] == "v2"
+
+
+    @patch("editor.cli.wipe_working_files")
+    @patch("editor.cli.save_final")
+    @patch("editor.cli.run_job")
+    @patch("editor.cli.load_feedback")
+    @patch("editor.cli.load_original")
+    def test_server_runs_session_as_job(self, mock_orig, mock_fb, mock_run, mock_save_f, mock_wipe, runner):
+        mock_orig.return_value = "Chapter text."
+        mock_fb.return_value = ""
+        mock_run.return_value = {
+            "warning": "",
+            "result": {"final": "Edited chapter.", "calls": [], "archive": "/srv/history/2026-01-01_ai"},
+        }
+
+        result = runner.invoke(cli, ["edit", "--server", "http://127.0.0.1:9000"])
+        assert result.exit_code == 0
+        assert "Archived to /srv/history/2026-01-01_ai" in result.output
+        assert mock_run.call_args[0] == ("http://127.0.0.1:9000", {
+            "original": "Chapter text.", "feedback": "", "fast": False, "speculative": False,
+        })
+        mock_save_f.assert_called_once_with("Edited chapter.")
+        mock_wipe.assert_called_once()
 
 
 class TestPreferencesCommand:
@@ -117,6 +170,30 @@ class TestHistoryCommand:
         assert "2026-02-23_143022_human" in result.output
         assert "Human Feedback" in result.output
 
+    @patch("editor.cli.search")
+    def test_search_prints_hits(self, mock_search, runner):
+        mock_search.return_value = [Hit("2026-02-23_143022_human", "final.md", 12, "the [lattice] hummed", -1.5)]
+        result = runner.invoke(cli, ["history", "search", "lattice", "--file", "final.md"])
+        assert result.exit_code == 0
+        assert "2026-02-23_143022_human/final.md:12: the [lattice] hummed" in result.output
+        mock_search.assert_called_once_with("lattice", limit=20, files=("final.md",), raw=False)
+
+    @patch("editor.cli.search")
+    def test_search_no_matches(self, mock_search, runner):
+        mock_search.return_value = []
+        result = runner.invoke(cli, ["history", "search", "gamer", "brain"])
+        assert result.exit_code == 0
+        assert "No matches" in result.output
+        assert mock_search.call_args[0][0] == "gamer brain"
+
+    @patch("editor.cli.rebuild_search_index")
+    def test_reindex(self, mock_rebuild, runner):
+        mock_rebuild.return_value = (3, 5)
+        result = runner.invoke(cli, ["history", "reindex", "--fresh"])
+        assert result.exit_code == 0
+        assert "3 session(s)" in result.output
+        mock_rebuild.assert_called_once_with(fresh=True)
+
 
 class TestResetCommand:
     @patch("editor.cli.reset_preferences")
@@ -132,3 +209,323 @@ class TestResetCommand:
         result = runner.invoke(cli, ["reset"], input="n\n")
         assert result.exit_code != 0 or "Aborted" in result.output
         mock_reset.assert_not_called()
+
+
+class TestBookCommand:
+    @patch("editor.cli.edit_manuscript")
+    @patch("editor.cli.load_preferences")
+    def test_book_writes_to_output_dir(self, mock_prefs, mock_edit, runner, tmp_path):
+        book = tmp_path / "novel.md"
+        book.write_text("# Chapter 1\n\nText.", encoding="utf-8")
+        mock_prefs.return_value = "Be concise."
+        mock_edit.return_value = 1
+
+        result = runner.invoke(cli, ["book", str(book), "--out", str(tmp_path / "out")])
+        assert result.exit_code == 0
+        assert "Edited 1 chapter(s)" in result.output
+        args = mock_edit.call_args[0]
+        assert args[1] == tmp_path / "out" / "novel.final.md"
+        assert args[2] == tmp_path / "out" / "novel.aiedited.md"
+
+
+class TestIndexCommand:
+    @patch("editor.cli.rebuild_index")
+    def test_rebuilds(self, mock_rebuild, runner):
+        mock_rebuild.return_value = 3
+        result = runner.invoke(cli, ["index"])
+        assert result.exit_code == 0
+        assert "Indexed 3" in result.output
+
+    @patch("editor.cli.update_index")
+    @patch("editor.cli.archive_ai_only")
+    @patch("editor.cli.save_final")
+    @patch("editor.cli.save_reasoning")
+    @patch("editor.cli.edit_ai_only")
+    @patch("editor.cli.book_summary")
+    @patch("editor.cli.load_preferences")
+    @patch("editor.cli.load_feedback")
+    @patch("editor.cli.load_original")
+    def test_edit_uses_and_updates_index(
+        self, mock_orig, mock_fb, mock_prefs, mock_summary, mock_edit, mock_save_r, mock_save_f,
+        mock_archive, mock_update, runner
+    ):
+        mock_orig.return_value = "Chapter text."
+        mock_fb.return_value = ""
+        mock_prefs.return_value = "Be concise."
+        mock_summary.return_value = "Indexed 2 earlier chapter(s)."
+        mock_edit.return_value = ("AI reasoning.", "Edited chapter.")
+        mock_archive.return_value = Path("/tmp/history/2026-01-01_ai")
+
+        result = runner.invoke(cli, ["edit"])
+        assert result.exit_code == 0
+        assert mock_edit.call_args[1]["book_context"] == "Indexed 2 earlier chapter(s)."
+        mock_update.assert_called_once_with(Path("/tmp/history/2026-01-01_ai"))
+
+
+class TestReapplyCommand:
+    @patch("editor.cli.load_preferences")
+    def test_no_preferences(self, mock_prefs, runner):
+        mock_prefs.return_value = ""
+        result = runner.invoke(cli, ["reapply"])
+        assert result.exit_code == 0
+        assert "nothing to reapply" in result.output
+
+    @patch("editor.cli.reapply_affected")
+    @patch("editor.cli.plan_reapply")
+    @patch("editor.cli.load_preferences")
+    def test_dry_run_lists_affected_only(self, mock_prefs, mock_plan, mock_reapply, runner):
+        from editor.reapply import Candidate
+
+        mock_prefs.return_value = 'NEVER use "gamer"'
+        mock_plan.return_value = [
+            Candidate("2026-01-01_000000_human", Path("/tmp/a"), {'"gamer"': 2}),
+            Candidate("2026-01-02_000000_human", Path("/tmp/b"), {}),
+        ]
+        result = runner.invoke(cli, ["reapply", "--dry-run"])
+        assert result.exit_code == 0
+        assert "1 affected" in result.output
+        assert '2026-01-01_000000_human: "gamer" ×2' in result.output
+        mock_reapply.assert_not_called()
+
+    @patch("editor.cli.mark_checked")
+    @patch("editor.cli.reapply_affected", return_value=[])
+    @patch("editor.cli.plan_reapply")
+    @patch("editor.cli.load_preferences")
+    def test_lists_rules_that_cant_be_checked(self, mock_prefs, mock_plan, mock_reapply, mock_mark, runner):
+        from editor.reapply import Candidate
+
+        mock_prefs.return_value = "**Kenji should handle combat**"
+        mock_plan.return_value = [
+            Candidate("2026-01-01_000000_human", Path("/tmp/a"), {}, ["**Kenji should handle combat**"]),
+        ]
+        result = runner.invoke(cli, ["reapply"])
+        assert result.exit_code == 0
+        assert "can't be checked locally" in result.output
+        assert "- **Kenji should handle combat**" in result.output
+        assert "--all" in result.output
+        assert mock_reapply.call_args[1]["include_unchecked"] is False
+
+        runner.invoke(cli, ["reapply", "--all"])
+        assert mock_reapply.call_args[1]["include_unchecked"] is True
+
+
+    @patch("editor.cli.mark_checked")
+    @patch("editor.cli.reapply_affected")
+    @patch("editor.cli.run_jobs")
+    @patch("editor.cli.plan_reapply")
+    @patch("editor.cli.load_preferences")
+    def test_server_queues_background_jobs(self, mock_prefs, mock_plan, mock_run, mock_reapply, mock_mark, runner):
+        from editor.client import JobError
+        from editor.reapply import Candidate
+
+        mock_prefs.return_value = 'NEVER use "gamer"'
+        mock_plan.return_value = [
+            Candidate("2026-01-01_000000_human", Path("/tmp/a"), {'"gamer"': 1}),
+            Candidate("2026-01-02_000000_human", Path("/tmp/b"), {'"gamer"': 3}),
+            Candidate("2026-01-03_000000_human", Path("/tmp/c"), {}),
+        ]
+
+        def run(server, bodies, window, on_done):
+            on_done(0, {"result": {"archive": "/srv/history/2026-02-01_000000_human"}}, None)
+            on_done(1, None, JobError("job server: boom"))
+
+        mock_run.side_effect = run
+        result = runner.invoke(cli, ["reapply", "--server", "http://127.0.0.1:9000", "--workers", "2"])
+        assert result.exit_code == 0
+        assert mock_run.call_args[0][1] == [
+            {"task": "reapply", "session": "2026-01-01_000000_human", "fast": False},
+            {"task": "reapply", "session": "2026-01-02_000000_human", "fast": False},
+        ]
+        assert mock_run.call_args[1]["window"] == 2
+        assert "Re-edited 2026-01-01_000000_human -> 2026-02-01_000000_human" in result.output
+        assert "Failed 2026-01-02_000000_human: job server: boom" in result.output
+        assert "Re-edited 1 chapter(s); skipped 1." in result.output
+        mock_reapply.assert_not_called()
+        mock_mark.assert_called_once()
+
+
+class TestPreferencesRebuildCommand:
+    @patch("editor.cli.backup_preferences", return_value=False)
+    @patch("editor.cli.save_preferences")
+    @patch("editor.cli.rebuild_preferences")
+    @patch("editor.cli.load_preferences")
+    def test_rebuild_saves(self, mock_prefs, mock_rebuild, mock_save, mock_backup, runner):
+        mock_prefs.return_value = ""
+        mock_rebuild.return_value = "# Preferences\n- Rebuilt."
+        result = runner.invoke(cli, ["preferences", "rebuild"])
+        assert result.exit_code == 0
+        assert "Rebuilt authorpreferences.md" in result.output
+        mock_save.assert_called_once_with("# Preferences\n- Rebuilt.")
+
+    @patch("editor.cli.save_preferences")
+    @patch("editor.cli.rebuild_preferences")
+    @patch("editor.cli.load_preferences")
+    def test_rebuild_asks_before_overwriting(self, mock_prefs, mock_rebuild, mock_save, runner):
+        mock_prefs.return_value = "existing"
+        result = runner.invoke(cli, ["preferences", "rebuild"], input="n\n")
+        assert result.exit_code != 0
+        mock_rebuild.assert_not_called()
+        mock_save.assert_not_called()
+
+
+    @patch("editor.cli.backup_preferences", return_value=False)
+    @patch("editor.cli.save_preferences")
+    @patch("editor.cli.rebuild_preferences")
+    @patch("editor.cli.run_job")
+    @patch("editor.cli.load_preferences")
+    def test_rebuild_on_server(self, mock_prefs, mock_run, mock_rebuild, mock_save, mock_backup, runner):
+        mock_prefs.return_value = ""
+        mock_run.return_value = {"result": {"preferences": "# Preferences\n- Rebuilt."}}
+        result = runner.invoke(cli, ["preferences", "rebuild", "--server", "http://127.0.0.1:9000"])
+        assert result.exit_code == 0
+        assert mock_run.call_args[0][1]["task"] == "rebuild"
+        mock_rebuild.assert_not_called()
+        mock_save.assert_called_once_with("# Preferences\n- Rebuilt.")
+
+
+class TestPreferencesCompactCommand:
+    @patch("editor.cli.save_preferences")
+    @patch("editor.cli.backup_preferences")
+    @patch("editor.cli.compact_preferences")
+    @patch("editor.cli.load_preferences")
+    def test_compact_reports_tokens_and_backs_up(self, mock_prefs, mock_compact, mock_backup, mock_save, runner):
+        mock_prefs.return_value = "x" * 400
+        mock_compact.return_value = "x" * 100
+        result = runner.invoke(cli, ["preferences", "compact"])
+        assert result.exit_code == 0
+        assert "~100 -> ~25 tokens" in result.output
+        mock_backup.assert_called_once()
+        mock_save.assert_called_once_with("x" * 100)
+
+    @patch("editor.cli.save_preferences")
+    @patch("editor.cli.compact_preferences")
+    @patch("editor.cli.load_preferences")
+    def test_compact_unchanged_not_saved(self, mock_prefs, mock_compact, mock_save, runner):
+        mock_prefs.return_value = "prefs"
+        mock_compact.return_value = "prefs"
+        result = runner.invoke(cli, ["preferences", "compact"])
+        assert "kept as is" in result.output
+        mock_save.assert_not_called()
+
+    @patch("editor.cli.rollback_preferences")
+    def test_rollback(self, mock_rollback, runner):
+        mock_rollback.return_value = True
+        result = runner.invoke(cli, ["preferences", "rollback"])
+        assert result.exit_code == 0
+        assert "Restored" in result.output
+
+    @patch("editor.cli._compact")
+    @patch("editor.cli.snapshot_preferences", return_value="v2")
+    @patch("editor.cli.archive_human_feedback")
+    @patch("editor.cli.save_preferences")
+    @patch("editor.cli.update_preferences")
+    @patch("editor.cli.save_final")
+    @patch("editor.cli.save_reasoning")
+    @patch("editor.cli.edit_with_feedback")
+    @patch("editor.cli.load_preferences")
+    @patch("editor.cli.load_feedback")
+    @patch("editor.cli.load_original")
+    def test_edit_auto_compacts_large_preferences(
+        self, mock_orig, mock_fb, mock_prefs, mock_edit, mock_save_r, mock_save_f,
+        mock_update_prefs, mock_save_prefs, mock_archive, mock_snapshot, mock_compact, runner
+    ):
+        mock_orig.return_value = "Chapter text."
+        mock_fb.return_value = "[too wordy]"
+        mock_prefs.return_value = ""
+        mock_edit.return_value = ("Reasoning.", "Edited chapter.")
+        mock_update_prefs.return_value = "x" * 100_000
+        mock_archive.return_value = Path("/tmp/history/2026-01-01_human")
+
+        result = runner.invoke(cli, ["edit"])
+        assert result.exit_code == 0
+        assert "compacting" in result.output
+        mock_compact.assert_called_once_with("x" * 100_000)
+
+    @patch("editor.cli.compact_preferences", side_effect=AnthropicError("overloaded"))
+    @patch("editor.cli.snapshot_preferences", return_value="v2")
+    @patch("editor.cli.archive_human_feedback")
+    @patch("editor.cli.save_preferences")
+    @patch("editor.cli.update_preferences")
+    @patch("editor.cli.save_final")
+    @patch("editor.cli.save_reasoning")
+    @patch("editor.cli.edit_with_feedback")
+    @patch("editor.cli.load_preferences")
+    @patch("editor.cli.load_feedback")
+    @patch("editor.cli.load_original")
+    def test_edit_archives_when_compaction_api_fails(
+        self, mock_orig, mock_fb, mock_prefs, mock_edit, mock_save_r, mock_save_f,
+        mock_update_prefs, mock_save_prefs, mock_archive, mock_snapshot, mock_compact, runner
+    ):
+        mock_orig.return_value = "Chapter text."
+        mock_fb.return_value = "[too wordy]"
+        mock_prefs.return_value = ""
+        mock_edit.return_value = ("Reasoning.", "Edited chapter.")
+        mock_update_prefs.return_value = "x" * 100_000
+        mock_archive.return_value = Path("/tmp/history/2026-01-01_human")
+
+        result = runner.invoke(cli, ["edit"])
+        assert result.exit_code == 0
+        assert "compaction failed: overloaded" in result.output
+        mock_archive.assert_called_once()
+
+
+class TestEditProfiling:
+    @patch("editor.cli.archive_ai_only")
+    @patch("editor.cli.save_final")
+    @patch("editor.cli.save_reasoning")
+    @patch("editor.cli.edit_ai_only")
+    @patch("editor.cli.load_preferences")
+    @patch("editor.cli.load_feedback")
+    @patch("editor.cli.load_original")
+    def test_profile_writes_trace_to_archive(
+        self, mock_orig, mock_fb, mock_prefs, mock_edit, mock_save_r, mock_save_f, mock_archive,
+        runner, tmp_path
+    ):
+        mock_orig.return_value = "Chapter text."
+        mock_fb.return_value = ""
+        mock_prefs.return_value = ""
+        mock_edit.return_value = ("AI reasoning.", "Edited chapter.")
+        mock_archive.return_value = tmp_path
+
+        result = runner.invoke(cli, ["edit", "--profile"])
+        assert result.exit_code == 0
+        assert "Wrote trace.json" in result.output
+        events = json.loads((tmp_path / "trace.json").read_text(encoding="utf-8"))["traceEvents"]
+        assert {"edit", "book_context", "update_index"} <= {e["name"] for e in events}
+
+
+class TestMetricsCommand:
+    @patch("editor.cli.request_json")
+    def test_prints_scheduler_and_jobs(self, mock_request, runner):
+        stats = {"weight": 1, "queued": 7, "running": 1, "completed": 20, "preempted": 3,
+                 "tokens": 0, "wait_avg_s": 3.2, "wait_max_s": 10.1, "oldest_queued_s": 4.0}
+        payload = {
+            "jobs": {"queued": 1, "running": 2, "done": 3, "failed": 0},
+            "scheduler": {"max_concurrent": 4, "token_budget": 0, "running": 2, "tokens_in_flight": 900,
+                          "classes": {"bulk": stats}},
+        }
+        mock_request.return_value = payload
+        result = runner.invoke(cli, ["metrics", "--server", "http://127.0.0.1:9000"])
+        assert result.exit_code == 0
+        assert "2/4 running" in result.output
+        assert "budget unlimited" in result.output
+        assert "preempted   3" in result.output
+        assert "wait avg 3.20s max 10.10s" in result.output
+        assert "Jobs: queued 1, running 2, done 3, failed 0" in result.output
+        assert mock_request.call_args[0][:2] == ("http://127.0.0.1:9000", "/metrics")
+
+    @patch("editor.cli.request_json")
+    def test_server_not_running(self, mock_request, runner):
+        mock_request.side_effect = RuntimeError("couldn't reach the job server")
+        result = runner.invoke(cli, ["metrics"])
+        assert result.exit_code != 0
+        assert "couldn't read metrics" in result.output
+
+
+
+class TestServeCommand:
+    @patch("editor.cli.make_server")
+    def test_rejects_zero_workers(self, mock_make, runner):
+        result = runner.invoke(cli, ["serve", "--workers", "0"])
+        assert result.exit_code == 2
+        mock_make.assert_not_called()
@@ -0,0 +1,79 @@
+"""Tests for the whole-book consistency index."""
+
+from __future__ import annotations
+
+from editor import index
+
+
+PREFS = '**Avoid overusing "lattice"** - vary it.'
+
+
+class TestChapterStats:
+    def test_counts_terms_and_names(self):
+        stats = index.chapter_stats("Kenji ran. The lattice glowed and Kenji saw Lyra by the lattice.")
+        assert stats["terms"]["lattice"] == 2
+        assert stats["names"] == {"Kenji": 2, "Lyra": 1}
+
+    def test_sentence_initial_words_are_not_names(self):
+        stats = index.chapter_stats("Suddenly it moved. Then it stopped.")
+        assert stats["names"] == {}
+
+    def test_only_repeated_phrases_kept(self):
+        stats = index.chapter_stats("pale veins spread. pale veins again. once more.")
+        assert stats["phrases"]["pale veins"] == 2
+        assert "once more" not in stats["phrases"]
+
+
+class TestUpdateIndex:
+    def test_incremental_update(self, make_session):
+        assert index.update_index(make_session("2026-01-01_000000_human", final="The lattice hummed."))
+        assert index.update_index(make_session("2026-01-02_000000_ai", final="More lattice."))
+        chapters = index.load_index()["chapters"]
+        assert set(chapters) == {"2026-01-01_000000_human", "2026-01-02_000000_ai"}
+
+    def test_session_without_text_skipped(self, history):
+        folder = history / "2026-01-01_000000_ai"
+        folder.mkdir()
+        assert index.update_index(folder) is False
+
+    def test_rebuild(self, make_session):
+        make_session("2026-01-01_000000_human", final="One.")
+        make_session("2026-01-02_000000_human", final="Two.")
+        assert index.rebuild_index() == 2
+        assert len(index.load_index()["chapters"]) == 2
+
+
+class TestBookSummary:
+    def test_empty_index_gives_no_summary(self, history):
+        assert index.book_summary("text", PREFS) == ""
+
+    def test_summarises_terms_names_and_phrases(self, make_session):
+        phrase = "the pale veins pulsed. the pale veins pulsed."
+        for day in range(1, 4):
+            make_session(f"2026-01-0{day}_000000_human", final=f"Then Kenji saw the lattice. {phrase}")
+        index.rebuild_index()
+
+        summary = index.book_summary(f"Lyra and Kenji found a lattice. {phrase}", PREFS)
+        assert "Indexed 3 earlier chapter(s)" in summary
+        assert '"lattice": 3 time(s) in 3 earlier chapter(s); 1 here' in summary
+        assert "Kenji (4)" in summary
+        assert '"the pale veins": 3 earlier chapter(s); 2 here' in summary
+
+    def test_multi_word_terms_used_once_per_chapter_are_counted(self, make_session):
+        prefs = 'Never use "gamer brain".'
+        make_session("2026-01-01_000000_human", final="His gamer brain lit up. Then gamer brain again.")
+        make_session("2026-01-02_000000_human", final="The gamer brain kicked in.")
+        index.rebuild_index()
+
+        summary = index.book_summary("No games here.", prefs)
+        assert '"gamer brain": 3 time(s) in 2 earlier chapter(s); 0 here' in summary
+        # counts are saved, so the archived text is only read once
+        assert all("term:gamer brain" in c["pref_terms"] for c in index.load_index()["chapters"].values())
+
+    def test_in_memory_chapters(self, history):
+        idx = {"version": index.INDEX_VERSION, "chapters": {}}
+        index.add_chapter(idx, "book.md chapter 1", "The lattice glowed. The lattice dimmed.", PREFS)
+        summary = index.book_summary("A lattice.", PREFS, idx)
+        assert '"lattice": 2 time(s) in 1 earlier chapter(s); 1 here' in summary
+        assert not (history / ".index.json").exists()
+
@@ -0,0 +1,149 @@
+"""Tests for streamed whole-book manuscript handling."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from editor.manuscript import edit_manuscript, iter_units
+
+
+BOOK = """\
+\ufeffTitle page
+
+# Chapter 1
+
+Kenji woke.
+
+* * *
+
+Lyra watched the veins.
+
+# Chapter 2
+
+The fight began.
+"""
+
+
+@pytest.fixture
+def book(tmp_path: Path) -> Path:
+    path = tmp_path / "book.md"
+    path.write_text(BOOK, encoding="utf-8")
+    return path
+
+
+class TestIterUnits:
+    def test_splits_chapters(self, book):
+        units = list(iter_units(book))
+        assert [u.title for u in units] == ["Title page", "Chapter 1", "Chapter 2"]
+        assert "* * *" in units[1].text
+        assert units[1].text.startswith("# Chapter 1")
+
+    def test_strips_bom(self, book):
+        assert not next(iter_units(book)).text.startswith("\ufeff")
+
+    def test_splits_scenes(self, book):
+        units = list(iter_units(book, unit="scene"))
+        assert len(units) == 4
+        assert units[2].text == "Lyra watched the veins."
+        assert units[2].separator == "* * *"
+
+    def test_is_lazy(self, book):
+        units = iter_units(book)
+        assert next(units).index == 1
+
+    def test_plain_chapter_heading(self, tmp_path):
+        path = tmp_path / "b.md"
+        path.write_text("Chapter One\nText.\nCHAPTER TWO\nMore.", encoding="utf-8")
+        assert [u.title for u in iter_units(path)] == ["Chapter One", "CHAPTER TWO"]
+
+    def test_subtitle_stays_with_chapter_heading(self, tmp_path):
+        path = tmp_path / "b.md"
+        path.write_text("# Chapter 5\n\n## The Throat of It\n\nKenji ran.\n\n# Chapter 6\n\nHe stopped.",
+                        encoding="utf-8")
+        units = list(iter_units(path))
+        assert [u.title for u in units] == ["Chapter 5", "Chapter 6"]
+        assert units[0].text == "# Chapter 5\n\n## The Throat of It\n\nKenji ran."
+
+    def test_subheadings_inside_chapters_are_body(self, tmp_path):
+        path = tmp_path / "b.md"
+        path.write_text("# Chapter 1\n\nKenji woke.\n\n## A subsection\n\nLyra watched.\n\n"
+                        "# Chapter 2\n\nThe fight began.", encoding="utf-8")
+        units = list(iter_units(path))
+        assert [u.title for u in units] == ["Chapter 1", "Chapter 2"]
+        assert "## A subsection" in units[0].text
+        scenes = list(iter_units(path, unit="scene"))
+        assert [u.title for u in scenes] == ["Chapter 1", "A subsection", "Chapter 2"]
+
+    def test_double_hash_chapters_under_book_title(self, tmp_path):
+        path = tmp_path / "b.md"
+        path.write_text("# The Lattice\n\n## One\n\nKenji woke.\n\n## Two\n\nThe fight began.",
+                        encoding="utf-8")
+        assert [u.title for u in iter_units(path)] == ["The Lattice", "Two"]
+
+    def test_chapter_in_prose_is_not_a_heading(self, tmp_path):
+        path = tmp_path / "b.md"
+        path.write_text("# Chapter 5\n\nKenji ran.\n\nChapter and verse, he knew.\n\n"
+                        "Chapter 6: The Fall\n\nHe stopped.", encoding="utf-8")
+        units = list(iter_units(path))
+        assert [u.title for u in units] == ["Chapter 5", "Chapter 6: The Fall"]
+        assert units[0].text.endswith("Chapter and verse, he knew.")
+
+    def test_heading_only_units_merge_into_next(self, tmp_path):
+        path = tmp_path / "b.md"
+        path.write_text("# Part One\n\n# Chapter 1\n\nKenji woke.\n\n# Chapter 2\n", encoding="utf-8")
+        units = list(iter_units(path))
+        assert [u.text for u in units] == ["# Part One\n\n# Chapter 1\n\nKenji woke.", "# Chapter 2"]
+
+    def test_front_matter_flagged(self, book, tmp_path):
+        units = list(iter_units(book))
+        assert [u.front_matter for u in units] == [True, False, False]
+        path = tmp_path / "plain.md"
+        path.write_text("No headings at all.", encoding="utf-8")
+        assert not next(iter_units(path)).front_matter
+
+    def test_bad_unit(self, book):
+        with pytest.raises(ValueError):
+            list(iter_units(book, unit="page"))
+
+
+class TestEditManuscript:
+    @patch("editor.manuscript.edit_ai_only")
+    def test_edits_each_unit_and_streams_output(self, mock_edit, book, tmp_path):
+        mock_edit.side_effect = lambda text, prefs, **kw: (f"why {len(text)}", text.upper())
+        final_path = tmp_path / "out" / "book.final.md"
+        reasoning_path = tmp_path / "out" / "book.aiedited.md"
+
+        count = edit_manuscript(book, final_path, reasoning_path, "prefs", unit="scene")
+        assert count == 3  # front matter is copied, not edited
+        final = final_path.read_text(encoding="utf-8")
+        assert final.startswith("Title page\n\n# CHAPTER 1")
+        assert all("Title page" not in c[0][0] for c in mock_edit.call_args_list)
+        assert "KENJI WOKE." in final
+        assert "\n\n* * *\n\nLYRA WATCHED THE VEINS." in final
+        assert "## Scene 3: Lyra watched the veins." in reasoning_path.read_text(encoding="utf-8")
+
+    @patch("editor.manuscript.load_index")
+    @patch("editor.manuscript.edit_ai_only")
+    def test_later_units_see_earlier_ones_in_book_context(self, mock_edit, mock_load, book, tmp_path):
+        mock_load.return_value = {"version": 1, "chapters": {}}
+        mock_edit.side_effect = lambda text, prefs, **kw: ("why", text)
+
+        edit_manuscript(book, tmp_path / "f.md", tmp_path / "r.md", 'Avoid "veins".')
+        contexts = [c[1]["book_context"] for c in mock_edit.call_args_list]
+        assert contexts[0] == ""
+        assert "Indexed 1 earlier chapter(s)" in contexts[1]
+        assert '"veins": 1 time(s) in 1 earlier chapter(s); 0 here' in contexts[1]
+
+    @patch("editor.manuscript.edit_ai_only")
+    def test_resume_appends_from_start(self, mock_edit, book, tmp_path):
+        mock_edit.side_effect = lambda text, prefs, **kw: ("why", text)
+        final_path = tmp_path / "book.final.md"
+        reasoning_path = tmp_path / "book.aiedited.md"
+        final_path.write_text("Title page\n\n# Chapter 1\n\nKenji woke.", encoding="utf-8")
+
+        count = edit_manuscript(book, final_path, reasoning_path, "prefs", start=3)
+        assert count == 1
+        assert final_path.read_text(encoding="utf-8").endswith("Kenji woke.\n\n# Chapter 2\n\nThe fight began.")
@@ -0,0 +1,111 @@
+"""Tests for the incremental ===FINAL=== output parser."""
+
+from __future__ import annotations
+
+import pytest
+
+from editor.parser import OutputParser, looks_like_reasoning, parse_output, validate_final
+
+
+def _feed_in_chunks(text: str, size: int):
+    parser = OutputParser()
+    for i in range(0, len(text), size):
+        parser.feed(text[i:i + size])
+    return parser.close()
+
+
+class TestOutputParser:
+    def test_splits_on_exact_delimiter(self):
+        parsed = parse_output("reasoning\n===FINAL===\nchapter")
+        assert parsed.delimiter_found
+        assert parsed.reasoning == "reasoning"
+        assert parsed.final == "chapter"
+
+    @pytest.mark.parametrize("size", [1, 2, 3, 5, 7])
+    def test_delimiter_split_across_chunks(self, size):
+        parsed = _feed_in_chunks("Changed X.\n===FINAL===\n# Chapter 1\n\nText.", size)
+        assert parsed.reasoning == "Changed X."
+        assert parsed.final == "# Chapter 1\n\nText."
+
+    @pytest.mark.parametrize(
+        "line",
+        ["=== FINAL ===", "==FINAL==", "**===FINAL===**", "## ===FINAL CHAPTER===", "===final", "FINAL==="],
+    )
+    def test_near_miss_delimiters(self, line):
+        parsed = _feed_in_chunks(f"reasoning\n{line}\nchapter", 4)
+        assert parsed.delimiter_found
+        assert parsed.reasoning == "reasoning"
+        assert parsed.final == "chapter"
+
+    def test_inline_delimiter(self):
+        parsed = parse_output("reasoning ===FINAL=== chapter")
+        assert parsed.reasoning == "reasoning"
+        assert parsed.final == "chapter"
+
+    def test_only_first_delimiter_splits(self):
+        parsed = parse_output("a\n===FINAL===\nb\n===FINAL===\nc")
+        assert parsed.reasoning == "a"
+        assert "===FINAL===" in parsed.final
+
+    def test_no_delimiter_plain_text_is_final(self):
+        parsed = parse_output("Just the chapter.")
+        assert not parsed.delimiter_found
+        assert parsed.final == "Just the chapter."
+        assert parsed.missing_reasoning
+
+    def test_no_delimiter_reasoning_is_not_final(self):
+        parsed = parse_output("OUTPUT 1 — REASONING\nBefore: He was tired.\nAfter: Tired.")
+        assert parsed.missing_final
+        assert "Before:" in parsed.reasoning
+
+    def test_word_final_in_prose_is_not_delimiter(self):
+        parsed = parse_output("The final battle began.\n===FINAL===\nchapter")
+        assert parsed.reasoning == "The final battle began."
+
+
+class TestValidateFinal:
+    def test_clean_chapter_passes(self):
+        original = "word " * 400
+        assert validate_final("word " * 380, original) == []
+
+    def test_empty_fails(self):
+        assert validate_final("", "text") == ["final chapter is empty"]
+
+    def test_truncated_chapter_fails_ratio(self):
+        original = "word " * 400
+        problems = validate_final("word " * 50, original)
+        assert any("length ratio" in p for p in problems)
+
+    def test_ratio_skipped_for_short_originals(self):
+        assert validate_final("A much longer rewrite of it.", "Short.") == []
+
+    def test_leftover_reasoning_marker_fails(self):
+        problems = validate_final("Chapter text.\n\nOUTPUT 2 — FINAL", "Chapter text.")
+        assert any("reasoning marker" in p for p in problems)
+
+    def test_looks_like_reasoning(self):
+        assert looks_like_reasoning("## Reasoning\nChanged a line.")
+        assert not looks_like_reasoning("Kenji raised his sword.")
+
+    def test_prose_that_starts_like_a_label_passes(self):
+        prose = (
+            "Reasoning with Kenji was pointless.\n\n"
+            "Original: that was what they called him.\n\n"
+            "Why: the question hung there.\n\n"
+            "Output 2 of the forge was slag.\n\n"
+            "Before: nothing. After the war, everything."
+        )
+        assert validate_final(prose, prose) == []
+        assert not looks_like_reasoning(prose)
+
+    def test_prose_without_delimiter_is_final(self):
+        parsed = parse_output("Reasoning with Kenji was pointless.\n\nHe left.")
+        assert parsed.final.startswith("Reasoning with Kenji")
+        assert parsed.missing_reasoning
+
+    def test_label_forms_are_markers(self):
+        assert looks_like_reasoning("**REASONING**\nTrimmed a line.")
+        assert looks_like_reasoning("OUTPUT 1 \u2014 REASONING (for aiedited.md):")
+        assert looks_like_reasoning("Change 2: cut the adverb.")
+        assert looks_like_reasoning("- Before: He was tired.\n- After: Tired.")
+        assert not looks_like_reasoning("Before: He was tired.")
@@ -19,6 +19,7 @@ def tmp_files(tmp_path: Path):
         "AIEDITED_PATH": tmp_path / "aiedited.md",
         "FINAL_PATH": tmp_path / "final.md",
         "PREFERENCES_PATH": tmp_path / "authorpreferences.md",
+        "PREFERENCES_BACKUP_PATH": tmp_path / "authorpreferences.prev.md",
         "HISTORY_DIR": tmp_path / "history",
         "ROOT": tmp_path,
     }
@@ -94,3 +95,31 @@ class TestResetPreferences:
 
     def test_reset_missing_returns_false(self, tmp_files):
         assert profile.reset_preferences() is False
+
+
+class TestBackupRollback:
+    def test_backup_copies_current(self, tmp_files):
+        tmp_files["PREFERENCES_PATH"].write_text("v1", encoding="utf-8")
+        assert profile.backup_preferences() is True
+        assert tmp_files["PREFERENCES_BACKUP_PATH"].read_text(encoding="utf-8") == "v1"
+
+    def test_backup_nothing(self, tmp_files):
+        assert profile.backup_preferences() is False
+
+    def test_rollback_swaps(self, tmp_files):
+        tmp_files["PREFERENCES_PATH"].write_text("v1", encoding="utf-8")
+        profile.backup_preferences()
+        profile.save_preferences("v2")
+
+        assert profile.rollback_preferences() is True
+        assert profile.load_preferences() == "v1"
+        assert tmp_files["PREFERENCES_BACKUP_PATH"].read_text(encoding="utf-8") == "v2"
+
+    def test_rollback_after_reset_restores(self, tmp_files):
+        tmp_files["PREFERENCES_BACKUP_PATH"].write_text("v1", encoding="utf-8")
+        assert profile.rollback_preferences() is True
+        assert profile.load_preferences() == "v1"
+        assert not tmp_files["PREFERENCES_BACKUP_PATH"].exists()
+
+    def test_rollback_without_backup(self, tmp_files):
+        assert profile.rollback_preferences() is False
@@ -0,0 +1,109 @@
+"""Tests for selective re-editing of archived chapters."""
+
+from __future__ import annotations
+
+from unittest.mock import patch
+
+from editor import archive, reapply
+from editor.scheduler import class_for
+
+
+OLD_PREFS = '**Avoid overusing "lattice"** - vary it.'
+NEW_PREFS = OLD_PREFS + '\n**NEVER reference "gamer" concepts**'
+
+
+class TestPlan:
+    def test_only_new_rules_count(self, make_session):
+        make_session("2026-01-01_000000_human", final="The lattice glowed.", preferences=OLD_PREFS)
+        make_session("2026-01-02_000000_human", final="His gamer brain lit up.", preferences=OLD_PREFS)
+
+        plan = {c.name: c for c in reapply.plan_reapply(NEW_PREFS)}
+        assert not plan["2026-01-01_000000_human"].affected  # lattice rule isn't new
+        assert plan["2026-01-02_000000_human"].hits == {'"gamer"': 1}
+
+    def test_sessions_on_current_version_skipped(self, make_session):
+        make_session("2026-01-01_000000_human", final="gamer", preferences=NEW_PREFS)
+        assert reapply.plan_reapply(NEW_PREFS) == []
+
+    def test_untracked_sessions_check_all_rules(self, make_session):
+        make_session("2026-01-01_000000_ai", final="The lattice glowed.")
+        (candidate,) = reapply.plan_reapply(NEW_PREFS)
+        assert candidate.hits == {'"lattice"': 1}
+
+    def test_superseded_sessions_skipped(self, make_session):
+        folder = make_session("2026-01-01_000000_human", final="gamer", preferences=OLD_PREFS)
+        archive.write_session_meta(folder, {"superseded_by": "later"})
+        assert reapply.plan_reapply(NEW_PREFS) == []
+
+    def test_mark_checked_skips_next_time(self, make_session):
+        make_session("2026-01-01_000000_human", final="Nothing relevant.", preferences=OLD_PREFS)
+        reapply.mark_checked(reapply.plan_reapply(NEW_PREFS), NEW_PREFS)
+        assert reapply.plan_reapply(NEW_PREFS) == []
+
+
+    def test_plain_english_rules_reported_and_not_marked_checked(self, make_session):
+        prefs = NEW_PREFS + "\n\n**Kenji should handle combat, Lyra should notice environmental details**"
+        make_session("2026-01-01_000000_human", final="Lyra swung the sword.", preferences=OLD_PREFS)
+
+        (candidate,) = reapply.plan_reapply(prefs)
+        assert not candidate.affected
+        assert candidate.unchecked == ["**Kenji should handle combat, Lyra should notice environmental details**"]
+        reapply.mark_checked([candidate], prefs)
+        assert reapply.plan_reapply(prefs)[0].unchecked == candidate.unchecked
+
+    def test_unchanged_plain_english_rules_are_not_new(self, make_session):
+        prefs = "**Kenji should handle combat**\n\n" + OLD_PREFS
+        make_session("2026-01-01_000000_human", final="gamer", preferences=prefs)
+        (candidate,) = reapply.plan_reapply(prefs + '\n\n**NEVER reference "gamer" concepts**')
+        assert candidate.unchecked == []
+
+
+class TestReapply:
+    @patch("editor.reapply.edit_ai_only")
+    def test_reedits_only_affected_and_supersedes(self, mock_edit, make_session):
+        classes = []
+
+        def fake_edit(*args, **kwargs):
+            classes.append(class_for("edit_ai_only"))
+            return ("Removed gamer.", "His tactical mind lit up.")
+
+        mock_edit.side_effect = fake_edit
+        old = make_session("2026-01-02_000000_human", final="His gamer brain lit up.", preferences=OLD_PREFS)
+        make_session("2026-01-01_000000_human", final="The lattice glowed.", preferences=OLD_PREFS)
+
+        candidates = reapply.plan_reapply(NEW_PREFS)
+        created = reapply.reapply_affected(candidates, NEW_PREFS, workers=2)
+
+        assert len(created) == 1
+        mock_edit.assert_called_once()
+        new = created[0]
+        assert (new / "original.md").read_text(encoding="utf-8") == "His gamer brain lit up."
+        assert (new / "final.md").read_text(encoding="utf-8") == "His tactical mind lit up."
+        assert archive.read_session_meta(new)["reapplied_from"] == old.name
+        assert archive.read_session_meta(old)["superseded_by"] == new.name
+        assert [c for c in reapply.plan_reapply(NEW_PREFS) if c.affected] == []
+        assert classes == ["bulk"]
+
+    @patch("editor.reapply.edit_ai_only", return_value=("Kenji fights now.", "Kenji swung the sword."))
+    def test_include_unchecked_reedits_plain_english_candidates(self, mock_edit, make_session):
+        prefs = OLD_PREFS + "\n\n**Kenji should handle combat**"
+        old = make_session("2026-01-01_000000_human", final="Lyra swung the sword.", preferences=OLD_PREFS)
+        candidates = reapply.plan_reapply(prefs)
+
+        assert reapply.reapply_affected(candidates, prefs) == []
+        (created,) = reapply.reapply_affected(candidates, prefs, include_unchecked=True)
+        assert archive.read_session_meta(old)["superseded_by"] == created.name
+
+    @patch("editor.reapply.edit_ai_only")
+    def test_failure_reported_and_session_untouched(self, mock_edit, make_session):
+        mock_edit.side_effect = RuntimeError("api down")
+        old = make_session("2026-01-02_000000_human", final="gamer", preferences=OLD_PREFS)
+        errors = []
+
+        created = reapply.reapply_affected(
+            reapply.plan_reapply(NEW_PREFS), NEW_PREFS,
+            on_done=lambda c, folder, err: errors.append(err),
+        )
+        assert created == []
+        assert isinstance(errors[0], RuntimeError)
+        assert "superseded_by" not in archive.read_session_meta(old)
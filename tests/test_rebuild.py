@@ -0,0 +1,87 @@
+"""Tests for map-reduce preference rebuilding from history."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from editor import rebuild
+
+
+@pytest.fixture
+def session(make_session):
+    """An archived session whose texts name it, so merged rules show their source."""
+
+    def make(name: str, feedback: str = "[too wordy]") -> Path:
+        return make_session(name, original=f"original {name}", edited=feedback, final=f"final {name}")
+
+    return make
+
+
+def _fake_extract(original, feedback, final):
+    return f"- rule from {original.split()[-1]}"
+
+
+def _fake_merge(documents):
+    return "MERGED(" + " | ".join(documents) + ")"
+
+
+@patch("editor.rebuild.merge_preferences", side_effect=_fake_merge)
+@patch("editor.rebuild.extract_rule_candidates", side_effect=_fake_extract)
+class TestRebuild:
+    def test_no_sessions(self, mock_extract, mock_merge, history):
+        assert rebuild.rebuild_preferences() == ""
+        mock_merge.assert_not_called()
+
+    def test_only_sessions_with_feedback(self, mock_extract, mock_merge, session):
+        session("2026-01-01_000000_human")
+        session("2026-01-02_000000_human", feedback="")
+        session("2026-01-03_000000_ai")
+
+        result = rebuild.rebuild_preferences()
+        assert result == "MERGED(- rule from 2026-01-01_000000_human)"
+        assert mock_extract.call_count == 1
+
+    def test_hierarchical_reduce_oldest_first(self, mock_extract, mock_merge, session):
+        for day in range(1, 6):
+            session(f"2026-01-0{day}_000000_human")
+
+        result = rebuild.rebuild_preferences(fan_in=2, workers=3)
+        # 5 lists -> 3 (2 merges, one passes through) -> 2 (1 merge) -> 1 (1 merge)
+        assert mock_merge.call_count == 4
+        assert result.index("2026-01-01") < result.index("2026-01-05")
+
+    def test_resumes_from_cache(self, mock_extract, mock_merge, session):
+        for day in range(1, 4):
+            session(f"2026-01-0{day}_000000_human")
+        first = rebuild.rebuild_preferences(fan_in=2)
+        extract_calls, merge_calls = mock_extract.call_count, mock_merge.call_count
+
+        assert rebuild.rebuild_preferences(fan_in=2) == first
+        assert mock_extract.call_count == extract_calls
+        assert mock_merge.call_count == merge_calls
+
+    def test_new_session_only_costs_its_own_extraction(self, mock_extract, mock_merge, session):
+        session("2026-01-01_000000_human")
+        rebuild.rebuild_preferences()
+        session("2026-01-02_000000_human")
+        mock_extract.reset_mock()
+
+        rebuild.rebuild_preferences()
+        assert mock_extract.call_count == 1
+
+    def test_fresh_ignores_cache(self, mock_extract, mock_merge, session):
+        session("2026-01-01_000000_human")
+        rebuild.rebuild_preferences()
+        rebuild.rebuild_preferences(fresh=True)
+        assert mock_extract.call_count == 2
+
+    def test_reports_progress(self, mock_extract, mock_merge, session):
+        session("2026-01-01_000000_human")
+        session("2026-01-02_000000_human")
+        events = []
+
+        rebuild.rebuild_preferences(on_progress=lambda *e: events.append(e))
+        assert events == [("map", 1, 2), ("map", 2, 2), ("reduce level 1", 1, 1)]
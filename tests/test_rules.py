@@ -0,0 +1,76 @@
+"""Tests for the local preference-rule matcher."""
+
+from __future__ import annotations
+
+from editor.rules import count_matches, extract_rules, split_entries, unmatched_entries
+
+
+PREFS = """\
+# Author Style Preferences
+
+**Avoid overusing technical terms** - The author flagged "lattice" as being used too much and called it "redundant and cliche."
+- "lattice" was replaced with "pale geometry," "corruption veins"
+
+**NEVER reference "gamer" concepts directly** - The author stated this "breaks immersion." Examples flagged:
+- "Kenji's gamer instincts" → Changed to: "Kenji's tactical instincts"
+- "These aren't prisoners. They're hardware." → Changed to: "They were being used as hardware."
+
+**Vary how you describe character thinking** rather than repeatedly referencing "brain," or "gamer brain."
+"""
+
+
+class TestExtractRules:
+    def test_extracts_flagged_terms(self):
+        terms = [r.term for r in extract_rules(PREFS) if r.term]
+        assert terms == ["lattice", "gamer", "brain", "gamer brain"]
+
+    def test_skips_replacements_remarks_and_examples(self):
+        terms = {r.term for r in extract_rules(PREFS)}
+        assert "pale geometry" not in terms
+        assert "redundant and cliche" not in terms
+        assert "Kenji's tactical instincts" not in terms
+
+    def test_rule_source_is_the_preference_line(self):
+        rule = extract_rules(PREFS)[1]
+        assert rule.key == "term:gamer"
+        assert rule.source.startswith("**NEVER reference")
+
+    def test_lint_rule_enabled_by_preferences(self):
+        keys = [r.key for r in extract_rules(PREFS)]
+        assert "lint:negative-contrast" in keys
+        assert "lint:not-x-but-y" not in keys
+        assert "lint:not-x-but-y" in [r.key for r in extract_rules('AVOID "Not X, but Y" constructions')]
+
+    def test_empty_preferences(self):
+        assert extract_rules("") == []
+
+
+class TestEntries:
+    def test_bold_rules_keep_their_examples(self):
+        prefs = ('## Voice\n\n**Avoid "lattice"** - flagged:\n- "lattice" was cut\n\n'
+                 '- Be concise.\n- Never use "gamer".')
+        assert split_entries(prefs) == ['**Avoid "lattice"** - flagged:\n- "lattice" was cut',
+                                        "- Be concise.", '- Never use "gamer".']
+
+    def test_plain_english_rules_are_unmatched(self):
+        prefs = ('**Avoid overusing "lattice"** - vary it.\n\n'
+                 "**Kenji should handle combat, Lyra should notice environmental details**")
+        assert unmatched_entries(prefs) == [
+            "**Kenji should handle combat, Lyra should notice environmental details**"
+        ]
+
+
+class TestCountMatches:
+    def test_counts_case_insensitive_whole_words(self):
+        rule = extract_rules(PREFS)[0]
+        assert count_matches("The Lattice pulsed. Lattices? The lattice.", rule) == 2
+
+    def test_lint_patterns(self):
+        rules = {r.key: r for r in extract_rules('Avoid "not X, but Y" and negative-contrast lines.')}
+        assert count_matches("It was not fear, but hunger.", rules["lint:not-x-but-y"]) == 1
+        assert count_matches("These aren't prisoners. They're hardware.", rules["lint:negative-contrast"]) == 1
+        assert count_matches("They were hardware.", rules["lint:negative-contrast"]) == 0
+
+    def test_multiword_across_whitespace(self):
+        rule = extract_rules(PREFS)[3]
+        assert count_matches("his gamer\nbrain kicked in", rule) == 1
@@ -0,0 +1,123 @@
+"""Tests for the priority scheduler in front of Claude calls."""
+
+from __future__ import annotations
+
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from editor.analyzer import _call_claude
+from editor.scheduler import Scheduler, class_for, priority
+
+
+def _wait_queued(scheduler: Scheduler, n: int) -> None:
+    deadline = time.monotonic() + 5
+    while sum(c["queued"] for c in scheduler.metrics()["classes"].values()) < n:
+        assert time.monotonic() < deadline, "callers never queued"
+        time.sleep(0.005)
+
+
+def _run_queued(scheduler: Scheduler, requests: list[tuple[str, int]]) -> list[str]:
+    """Queue requests behind a held slot, then let them through one by one; return admission order."""
+    order: list[str] = []
+    holder = scheduler.acquire("interactive", 1)
+
+    def call(cls: str, cost: int) -> None:
+        ticket = scheduler.acquire(cls, cost)
+        order.append(cls)
+        scheduler.release(ticket)
+
+    threads = []
+    for n, (cls, cost) in enumerate(requests, 1):
+        thread = threading.Thread(target=call, args=(cls, cost))
+        thread.start()
+        threads.append(thread)
+        _wait_queued(scheduler, n)  # keep enqueue order deterministic
+    time.sleep(0.01)
+    scheduler.release(holder)
+    for thread in threads:
+        thread.join(timeout=5)
+    return order
+
+
+class TestClassFor:
+    def test_inferred_from_task(self):
+        assert class_for("edit_feedback") == "interactive"
+        assert class_for("preferences") == "preferences"
+        assert class_for("compaction") == "preferences"
+
+    def test_priority_block_overrides(self):
+        with priority("bulk"):
+            assert class_for("preferences") == "bulk"
+        assert class_for("default") == "interactive"
+
+    def test_unknown_class(self):
+        with pytest.raises(ValueError):
+            with priority("urgent"):
+                pass
+
+
+class TestScheduler:
+    def test_interactive_preempts_queued_bulk(self):
+        scheduler = Scheduler(max_concurrent=1)
+        order = _run_queued(scheduler, [("bulk", 10), ("bulk", 10), ("interactive", 10)])
+        assert order == ["interactive", "bulk", "bulk"]
+        assert scheduler.metrics()["classes"]["bulk"]["preempted"] == 2
+
+    def test_weighted_fair_share(self):
+        scheduler = Scheduler(max_concurrent=1)
+        order = _run_queued(scheduler, [("bulk", 10)] * 2 + [("preferences", 10)] * 6)
+        # weights 3:1 — bulk gets every fourth slot instead of waiting for all preference work
+        assert order == ["preferences"] * 3 + ["bulk"] + ["preferences"] * 3 + ["bulk"]
+
+    def test_token_budget(self):
+        scheduler = Scheduler(max_concurrent=4, token_budget=100)
+        first = scheduler.acquire("interactive", 60)
+        admitted = threading.Event()
+
+        def second():
+            scheduler.release(scheduler.acquire("interactive", 60))
+            admitted.set()
+
+        thread = threading.Thread(target=second)
+        thread.start()
+        _wait_queued(scheduler, 1)
+        assert not admitted.is_set()
+        assert scheduler.metrics()["tokens_in_flight"] == 60
+        scheduler.release(first)
+        thread.join(timeout=5)
+        assert admitted.is_set()
+
+    def test_oversized_call_runs_alone(self):
+        scheduler = Scheduler(token_budget=100)
+        ticket = scheduler.acquire("bulk", 500)
+        scheduler.release(ticket)
+        assert scheduler.metrics()["classes"]["bulk"]["completed"] == 1
+
+    def test_metrics_record_waits(self):
+        scheduler = Scheduler(max_concurrent=1)
+        _run_queued(scheduler, [("preferences", 5)])
+        stats = scheduler.metrics()["classes"]["preferences"]
+        assert stats["completed"] == 1 and stats["queued"] == 0 and stats["running"] == 0
+        assert stats["wait_max_s"] >= stats["wait_avg_s"] >= 0.01
+        assert stats["tokens"] == 5
+
+
+class TestCallClaudeScheduling:
+    @patch("editor.analyzer._get_client")
+    def test_calls_go_through_scheduler(self, mock_client):
+        response = MagicMock()
+        response.content = [MagicMock(text="ok")]
+        mock_client.return_value.messages.create.return_value = response
+        scheduler = Scheduler()
+
+        with patch("editor.analyzer.get_scheduler", return_value=scheduler):
+            _call_claude("sys", "user", task="preferences", model="m")
+            with priority("bulk"):
+                _call_claude("sys", "user", task="edit_ai_only", model="m")
+
+        classes = scheduler.metrics()["classes"]
+        assert (classes["preferences"]["completed"], classes["bulk"]["completed"]) == (1, 1)
+        assert scheduler.metrics()["running"] == 0
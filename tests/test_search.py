@@ -0,0 +1,92 @@
+"""Tests for the SQLite FTS5 history search index."""
+
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from editor.search import SEARCH_DB_NAME, rebuild_search_index, search, update_search_index
+
+
+class TestUpdate:
+    def test_indexes_lines_with_numbers(self, make_session):
+        folder = make_session("2026-01-01_000000_human",
+                              original="Kenji walked.\n\nThe lattice hummed.",
+                              edited="[too many lattices]",
+                              final="Kenji walked.\n\nThe web hummed.")
+        assert update_search_index(folder)
+
+        hits = search("lattice hummed")
+        assert [(h.session, h.file, h.line) for h in hits] == [("2026-01-01_000000_human", "original.md", 3)]
+        assert "[lattice]" in hits[0].snippet
+
+    def test_nothing_searchable_creates_no_database(self, history):
+        folder = history / "2026-01-01_000000_ai"
+        folder.mkdir()
+        (folder / "trace.json").write_text("{}", encoding="utf-8")
+        assert not update_search_index(folder)
+        assert not (history / SEARCH_DB_NAME).exists()
+
+    def test_changed_file_is_reindexed(self, make_session):
+        folder = make_session("2026-01-01_000000_ai", final="The lattice hummed.")
+        update_search_index(folder)
+        final = folder / "final.md"
+        final.write_text("The web sang.", encoding="utf-8")
+        stat = final.stat()
+        os.utime(final, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        update_search_index(folder)
+
+        assert search("lattice") == []
+        assert len(search("web")) == 1
+
+
+class TestSearch:
+    def test_ranks_denser_lines_first(self, make_session):
+        folder = make_session("2026-01-01_000000_ai",
+                              final="A gamer sat by a long quiet river under the old grey bridge.\ngamer gamer gamer.")
+        update_search_index(folder)
+        assert [h.line for h in search("gamer")] == [2, 1]
+
+    def test_file_filter_and_limit(self, make_session):
+        folder = make_session("2026-01-01_000000_human",
+                              original="gamer brain", edited="gamer brain", final="gamer brain")
+        update_search_index(folder)
+        assert [h.file for h in search("gamer", files=("edited.md",))] == ["edited.md"]
+        assert len(search("gamer", limit=2)) == 2
+
+    def test_punctuation_is_not_query_syntax(self, make_session):
+        update_search_index(make_session("2026-01-01_000000_ai", final='She said "not-x" twice.'))
+        assert len(search('"not-x"')) == 1
+        assert search("") == []
+
+    def test_raw_expression(self, make_session):
+        update_search_index(make_session("2026-01-01_000000_ai", final="gamer instincts\nlattice"))
+        assert len(search("gamer OR lattice", raw=True)) == 2
+        with pytest.raises(RuntimeError):
+            search("AND AND", raw=True)
+
+    def test_missing_database(self, history):
+        assert search("anything") == []
+
+
+class TestRebuild:
+    def test_incremental_and_drops_deleted_sessions(self, history, make_session):
+        make_session("2026-01-01_000000_ai", final="alpha")
+        gone = make_session("2026-01-02_000000_ai", final="beta")
+        (history / ".preferences").mkdir()
+
+        assert rebuild_search_index() == (2, 2)
+        assert rebuild_search_index() == (2, 0)
+
+        (gone / "final.md").unlink()
+        gone.rmdir()
+        assert rebuild_search_index() == (1, 0)
+        assert search("beta") == []
+        assert len(search("alpha")) == 1
+
+    def test_fresh_rereads_everything(self, make_session):
+        make_session("2026-01-01_000000_ai", original="alpha", final="alpha")
+        rebuild_search_index()
+        assert rebuild_search_index(fresh=True) == (1, 2)
+        assert len(search("alpha")) == 2
@@ -0,0 +1,314 @@
+"""Tests for the local HTTP job server, run on localhost with a fake model backend."""
+
+from __future__ import annotations
+
+import http.client
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from editor import archive, reapply
+from editor.client import JobError, request_json, run_job, run_jobs
+from editor.profile import load_preferences
+from editor.scheduler import class_for, get_scheduler
+from editor.server import JobQueue, make_server
+
+
+def fake_claude(system, user_content, max_tokens=16384, on_text=None, task="default", model=None):
+    """Stand-in for analyzer._call_claude: echoes the chapter in upper case."""
+    if task == "preferences":
+        return "# Preferences\n- Learned from feedback."
+    original = user_content.split("ORIGINAL:\n", 1)[1].split("\n\n", 1)[0]
+    return f"Uppercased it.\n===FINAL===\n{original.upper()}"
+
+
+@pytest.fixture
+def workspace(tmp_path: Path, history: Path):
+    prefs = tmp_path / "authorpreferences.md"
+    with patch("editor.profile.PREFERENCES_PATH", prefs), \
+            patch("editor.analyzer._call_claude", side_effect=fake_claude):
+        yield {"history": history, "prefs": prefs}
+
+
+@pytest.fixture
+def server(workspace):
+    httpd, jobs = make_server(port=0, workers=2)
+    jobs.start()
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+    jobs.stop()
+
+
+def _request(url: str, body: dict | None = None) -> tuple[int, dict]:
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=5) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as exc:
+        return exc.code, json.loads(exc.read())
+
+
+def _wait(url: str, job_id: str) -> dict:
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        _, job = _request(f"{url}/jobs/{job_id}")
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError("job did not finish")
+
+
+class TestHttpApi:
+    def test_ai_only_job_roundtrip(self, server, workspace):
+        status, body = _request(f"{server}/jobs", {"original": "kenji ran."})
+        assert status == 202
+
+        job = _wait(server, body["id"])
+        assert job["status"] == "done"
+        assert job["mode"] == "ai"
+        assert job["result"]["final"] == "KENJI RAN."
+        archive = Path(job["result"]["archive"])
+        assert archive.name.endswith("_ai")
+        assert (archive / "final.md").read_text(encoding="utf-8") == "KENJI RAN."
+
+    def test_feedback_job_updates_preferences(self, server, workspace):
+        _, body = _request(f"{server}/jobs", {"original": "kenji ran.", "feedback": "[shout it]"})
+        job = _wait(server, body["id"])
+        assert job["status"] == "done"
+        assert Path(job["result"]["archive"]).name.endswith("_human")
+        assert job["mode"] == "human"
+        assert job["warning"] is None
+        assert "Learned from feedback" in workspace["prefs"].read_text(encoding="utf-8")
+
+    def test_feedback_job_not_reapplied_for_its_own_rules(self, server, workspace):
+        def learns_lattice(system, user_content, *args, task="default", **kwargs):
+            if task == "preferences":
+                return '**Avoid overusing "lattice"** - vary it.'
+            return fake_claude(system, user_content, *args, task=task, **kwargs)
+
+        with patch("editor.analyzer._call_claude", side_effect=learns_lattice):
+            _, body = _request(f"{server}/jobs", {"original": "the lattice, the lattice.", "feedback": "[x]"})
+            job = _wait(server, body["id"])
+        assert reapply.plan_reapply(load_preferences()) == []
+        assert job["status"] == "done"
+
+    def test_concurrent_jobs_get_separate_archives(self, server, workspace):
+        ids = [_request(f"{server}/jobs", {"original": f"chapter {n}."})[1]["id"] for n in range(4)]
+        archives = {_wait(server, i)["result"]["archive"] for i in ids}
+        assert len(archives) == 4
+
+    def test_list_and_health(self, server):
+        _request(f"{server}/jobs", {"original": "x."})
+        status, listing = _request(f"{server}/jobs")
+        assert status == 200
+        assert len(listing["jobs"]) == 1
+        assert "original" not in listing["jobs"][0]
+        assert _request(f"{server}/health")[1]["status"] == "ok"
+
+    def test_metrics(self, server):
+        status, body = _request(f"{server}/metrics")
+        assert status == 200
+        assert set(body["jobs"]) == {"queued", "running", "done", "failed"}
+        assert set(body["scheduler"]["classes"]) == {"interactive", "preferences", "bulk"}
+
+    def test_invalid_bodies_rejected(self, server):
+        for body in ([1, 2], "x", {"original": "x.", "priority": ["a"]}, {"original": {"a": 1}}):
+            status, payload = _request(f"{server}/jobs", body)
+            assert status == 400, body
+            assert "error" in payload
+
+    def test_bad_content_length_rejected(self, server):
+        host, port = server.removeprefix("http://").split(":")
+        conn = http.client.HTTPConnection(host, int(port), timeout=5)
+        conn.putrequest("POST", "/jobs")
+        conn.putheader("Content-Length", "abc")
+        conn.endheaders()
+        response = conn.getresponse()
+        assert response.status == 400
+        conn.close()
+
+    def test_reapply_job_supersedes_session(self, server, make_session):
+        old = make_session("2026-01-01_000000_human", final="kenji ran.")
+        _, body = _request(f"{server}/jobs", {"task": "reapply", "session": old.name, "priority": "interactive"})
+        job = _wait(server, body["id"])
+        assert job["status"] == "done"
+        assert job["priority"] == "background"  # backlist work never jumps the queue
+        new = Path(job["result"]["archive"])
+        assert (new / "final.md").read_text(encoding="utf-8") == "KENJI RAN."
+        assert archive.read_session_meta(old)["superseded_by"] == new.name
+
+    def test_rebuild_job_returns_preferences(self, server):
+        with patch("editor.server.rebuild_preferences", return_value="# Rebuilt") as mock_rebuild:
+            _, body = _request(f"{server}/jobs", {"task": "rebuild", "fan_in": 3, "fresh": True})
+            job = _wait(server, body["id"])
+        assert job["result"] == {"preferences": "# Rebuilt"}
+        mock_rebuild.assert_called_once_with(fan_in=3, fresh=True)
+
+    def test_bad_tasks_rejected(self, server):
+        for body in ({"task": "nope"}, {"task": "reapply", "session": "../etc"},
+                     {"task": "reapply", "session": "2026-01-01_000000_ai"},
+                     {"task": "rebuild", "workers": 0}, {"task": "rebuild", "fresh": "yes"}):
+            status, _ = _request(f"{server}/jobs", body)
+            assert status == 400, body
+
+    def test_missing_original_rejected(self, server):
+        status, body = _request(f"{server}/jobs", {"feedback": "x"})
+        assert status == 400
+        assert "original" in body["error"]
+
+    def test_bad_priority_rejected(self, server):
+        status, _ = _request(f"{server}/jobs", {"original": "x.", "priority": "urgent"})
+        assert status == 400
+
+    def test_unknown_job(self, server):
+        assert _request(f"{server}/jobs/nope")[0] == 404
+
+
+class TestJobQueue:
+    def test_interactive_runs_before_queued_background(self, workspace):
+        release = threading.Event()
+        order = []
+
+        def run(job):
+            if job.original == "blocker":
+                release.wait(5)
+            order.append(job.original)
+            return {}
+
+        jobs = JobQueue(workers=1)
+        with patch.object(jobs, "_run", side_effect=run):
+            jobs.start()
+            jobs.submit("blocker")
+            time.sleep(0.05)
+            jobs.submit("bulk", priority="background")
+            jobs.submit("author", priority="interactive")
+            release.set()
+            deadline = time.time() + 5
+            while len(order) < 3 and time.time() < deadline:
+                time.sleep(0.01)
+            jobs.stop()
+
+        assert order == ["blocker", "author", "bulk"]
+
+    def test_needs_a_worker(self):
+        with pytest.raises(ValueError):
+            JobQueue(workers=0)
+
+    def test_default_workers_follow_scheduler_limit(self):
+        jobs = JobQueue()
+        assert jobs.workers == 2 * get_scheduler().max_concurrent
+        assert jobs.max_background == get_scheduler().max_concurrent
+
+    def test_background_jobs_leave_a_worker_for_authors(self, workspace):
+        release = threading.Event()
+        started = []
+
+        def run(job):
+            started.append(job.original)
+            if job.priority == "background":
+                release.wait(5)
+            return {}
+
+        jobs = JobQueue(workers=2)
+        assert jobs.max_background == 1
+        with patch.object(jobs, "_run", side_effect=run):
+            jobs.start()
+            jobs.submit("bulk 1", priority="background")
+            jobs.submit("bulk 2", priority="background")
+            author = jobs.submit("author")
+            deadline = time.time() + 5
+            while author.status != "done" and time.time() < deadline:
+                time.sleep(0.01)
+            assert sorted(started) == ["author", "bulk 1"]  # bulk 2 waits; the spare worker took the author
+            release.set()
+            jobs.stop()
+
+    def test_failure_is_reported_on_job(self, workspace):
+        jobs = JobQueue(workers=1)
+        with patch.object(jobs, "_run", side_effect=RuntimeError("boom")):
+            jobs.start()
+            job = jobs.submit("x")
+            deadline = time.time() + 5
+            while job.status not in ("done", "failed") and time.time() < deadline:
+                time.sleep(0.01)
+            jobs.stop()
+        assert job.status == "failed"
+        assert "boom" in job.error
+
+    def test_background_jobs_run_at_bulk_priority(self, workspace):
+        classes = {}
+
+        def run(job):
+            classes[job.original] = class_for("edit_ai_only")
+            return {}
+
+        jobs = JobQueue(workers=1)
+        with patch.object(jobs, "_run", side_effect=run):
+            jobs.start()
+            jobs.submit("bulk", priority="background")
+            jobs.submit("author")
+            deadline = time.time() + 5
+            while len(classes) < 2 and time.time() < deadline:
+                time.sleep(0.01)
+            jobs.stop()
+        assert classes == {"bulk": "bulk", "author": "interactive"}
+
+    def test_failed_preference_update_still_archives(self, workspace):
+        def failing_prefs(system, user_content, *args, task="default", **kwargs):
+            if task == "preferences":
+                raise RuntimeError("overloaded")
+            return fake_claude(system, user_content, *args, task=task, **kwargs)
+
+        jobs = JobQueue(workers=1)
+        with patch("editor.analyzer._call_claude", side_effect=failing_prefs):
+            jobs.start()
+            job = jobs.submit("kenji ran.", feedback="[shout it]")
+            deadline = time.time() + 5
+            while job.status not in ("done", "failed") and time.time() < deadline:
+                time.sleep(0.01)
+            jobs.stop()
+        assert job.status == "done"
+        assert "overloaded" in job.warning
+        assert (Path(job.result["archive"]) / "final.md").read_text(encoding="utf-8") == "KENJI RAN."
+
+    def test_finished_jobs_drop_texts_and_are_evicted(self, workspace):
+        jobs = JobQueue(workers=1, max_finished=2)
+        with patch.object(jobs, "_run", return_value={}):
+            jobs.start()
+            submitted = [jobs.submit(f"chapter {n}.") for n in range(3)]
+            deadline = time.time() + 5
+            while any(j.status != "done" for j in submitted) and time.time() < deadline:
+                time.sleep(0.01)
+            jobs.stop()
+        assert all(j.original == "" for j in submitted)
+        assert [j.id for j in jobs.jobs()] == [j.id for j in submitted[1:]]
+
+
+class TestClient:
+    def test_run_job_returns_finished_job(self, server):
+        job = run_job(server, {"original": "kenji ran."})
+        assert job["result"]["final"] == "KENJI RAN."
+
+    def test_rejected_and_failed_jobs_reported(self, server):
+        outcomes = {}
+        run_jobs(server, [{"original": "kenji ran."}, {"task": "nope"}],
+                 on_done=lambda i, job, error: outcomes.update({i: (job, error)}))
+        assert outcomes[0][0]["status"] == "done" and outcomes[0][1] is None
+        assert isinstance(outcomes[1][1], JobError)
+        with pytest.raises(JobError):
+            run_job(server, {"task": "reapply", "session": "missing"})
+
+    def test_unreachable_server(self):
+        with pytest.raises(RuntimeError, match="couldn't reach"):
+            request_json("http://127.0.0.1:9", "/health", timeout=1)
+
@@ -0,0 +1,30 @@
+"""Tests for the shared plain-text helpers."""
+
+from __future__ import annotations
+
+from editor.text import join_paragraphs, split_paragraphs, split_sentences
+
+
+class TestParagraphs:
+    def test_splits_on_blank_lines(self):
+        assert split_paragraphs("One.\n\nTwo.\n \n\nThree.") == ["One.", "Two.", "Three."]
+
+    def test_single_newlines_stay_in_paragraph(self):
+        assert split_paragraphs("Line one\nline two.") == ["Line one\nline two."]
+
+    def test_empty_text(self):
+        assert split_paragraphs("  \n\n ") == []
+
+    def test_roundtrip(self):
+        text = "# Chapter 1\n\nOne.\n\nTwo."
+        assert join_paragraphs(split_paragraphs(text)) == text
+
+
+class TestSentences:
+    def test_splits_on_terminal_punctuation(self):
+        assert split_sentences("He ran! Did he? Yes.") == ["He ran!", "Did he?", "Yes."]
+
+    def test_closing_quotes_stay_with_sentence(self):
+        assert split_sentences('"Not pets," Lyra said. "Wardens." Done') == [
+            '"Not pets," Lyra said.', '"Wardens."', "Done",
+        ]
@@ -0,0 +1,75 @@
+"""Tests for opt-in tracing spans."""
+
+from __future__ import annotations
+
+import json
+from unittest.mock import MagicMock, patch
+
+from editor import trace
+from editor.analyzer import _call_claude
+from editor.trace import env_mode, span, start_trace, stop_trace
+
+
+class TestSpan:
+    def test_no_op_without_active_trace(self):
+        with span("idle", x=1) as args:
+            args["y"] = 2
+        assert trace._active is None
+
+    def test_records_nested_spans(self, tmp_path):
+        tracer = start_trace()
+        try:
+            with span("outer"):
+                with span("inner", file="a.md") as args:
+                    args["chars"] = 3
+        finally:
+            stop_trace()
+
+        paths = tracer.save(tmp_path)
+        assert [p.name for p in paths] == ["trace.json"]
+        events = json.loads(paths[0].read_text(encoding="utf-8"))["traceEvents"]
+        outer, inner = events
+        assert (outer["name"], inner["name"]) == ("outer", "inner")
+        assert inner["ph"] == "X" and inner["args"] == {"file": "a.md", "chars": 3}
+        assert outer["ts"] <= inner["ts"]
+        assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"] + 1
+
+    def test_cprofile_writes_pstats(self, tmp_path):
+        tracer = start_trace(cprofile=True)
+        with span("work"):
+            sum(range(1000))
+        stop_trace()
+        names = [p.name for p in tracer.save(tmp_path)]
+        assert names == ["trace.json", "profile.pstats"]
+        assert (tmp_path / "profile.pstats").stat().st_size > 0
+
+
+class TestEnvMode:
+    def test_values(self, monkeypatch):
+        monkeypatch.delenv("EDITOR_TRACE", raising=False)
+        assert env_mode() == ""
+        monkeypatch.setenv("EDITOR_TRACE", "0")
+        assert env_mode() == ""
+        monkeypatch.setenv("EDITOR_TRACE", "1")
+        assert env_mode() == "trace"
+        monkeypatch.setenv("EDITOR_TRACE", "cprofile")
+        assert env_mode() == "cprofile"
+
+
+class TestApiCallSpan:
+    @patch("editor.analyzer._get_client")
+    def test_each_call_is_a_span(self, mock_client):
+        response = MagicMock()
+        response.content = [MagicMock(text="ok")]
+        mock_client.return_value.messages.create.return_value = response
+
+        tracer = start_trace()
+        try:
+            _call_claude("sys", "user", task="preferences", model="m")
+            _call_claude("sys", "user", task="changelog", model="m")
+        finally:
+            stop_trace()
+
+        calls = [e for e in tracer.events if e["name"] == "api_call"]
+        assert [c["args"]["task"] for c in calls] == ["preferences", "changelog"]
+        assert calls[0]["args"]["streamed"] is False